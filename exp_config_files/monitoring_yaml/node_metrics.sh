@@ -0,0 +1,29 @@
+#!/bin/sh
+# Sample the cumulative CPU, memory, disk and network counters of this node
+# every $1 seconds and append them to the CSV file $2.
+# Usage: node_metrics.sh <interval> <output_file>
+interval=$1
+output=$2
+
+# only the physical network interfaces, the traffic of the pods goes through them too
+ifaces=""
+for iface in /sys/class/net/*; do
+    if [ -e "$iface/device" ]; then
+        ifaces="$ifaces $(basename $iface)"
+    fi
+done
+
+echo "timestamp,cpu_busy,cpu_iowait,cpu_total,mem_used_kb,disk_read_sectors,disk_write_sectors,net_rx_bytes,net_tx_bytes" > $output
+while true; do
+    timestamp=$(date +%s.%N)
+    # user nice system idle iowait irq softirq steal
+    cpu=$(awk '/^cpu / {print $2+$3+$4+$7+$8+$9 "," $6 "," $2+$3+$4+$5+$6+$7+$8+$9}' /proc/stat)
+    mem=$(awk '/^MemTotal:/ {total=$2} /^MemAvailable:/ {available=$2} END {print total-available}' /proc/meminfo)
+    disk=$(awk '$3 ~ /^(sd[a-z]+|vd[a-z]+|nvme[0-9]+n[0-9]+)$/ {r+=$6; w+=$10} END {print r+0 "," w+0}' /proc/diskstats)
+    net=$(awk -v ifaces="$ifaces" 'NR > 2 {
+              sub(/^ +/, ""); split($0, a, ":"); split(a[2], b, " ")
+              if (index(" " ifaces " ", " " a[1] " ") > 0) {rx+=b[1]; tx+=b[9]}
+          } END {print rx+0 "," tx+0}' /proc/net/dev)
+    echo "$timestamp,$cpu,$mem,$disk,$net" >> $output
+    sleep $interval
+done
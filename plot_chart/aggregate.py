@@ -0,0 +1,176 @@
+from argparse import ArgumentParser
+from pathlib import Path
+import math
+
+import numpy as np
+import pandas as pd
+
+from process import OUTPUT_FORMATS, read_table, write_table
+
+# the columns that identify a point of the sweep, the iterations of a point are aggregated
+POINT_COLS = ['n_dc', 'n_nodes', 'concurrent_clients']
+# the metrics that get a median, a standard deviation and a confidence interval
+METRICS = ['throughput', 'latency']
+CI_METHODS = ['t', 'bootstrap']
+# the usual cutoff of the modified z-score (Iglewicz and Hoaglin), 0.6745 is the
+# ratio between the MAD and the standard deviation of a normal distribution
+MAD_THRESHOLD = 3.5
+N_BOOTSTRAP = 10000
+
+
+def _t_cdf(t, df):
+    # CDF of the Student t distribution with an integer number df of degrees of freedom,
+    # from the finite series of Abramowitz and Stegun 26.7.3 and 26.7.4
+    theta = math.atan(abs(t) / math.sqrt(df))
+    cos2 = math.cos(theta) ** 2
+    if df % 2 == 1:
+        term, series = math.cos(theta), 0.0
+        for k in range(1, (df - 1) // 2 + 1):
+            series += term
+            term *= cos2 * 2 * k / (2 * k + 1)
+        a = 2 / math.pi * (theta + math.sin(theta) * series)
+    else:
+        term, series = 1.0, 0.0
+        for k in range(1, df // 2 + 1):
+            series += term
+            term *= cos2 * (2 * k - 1) / (2 * k)
+        a = math.sin(theta) * series
+    return 0.5 + math.copysign(a, t) / 2
+
+
+def t_quantile(p, df):
+    # quantile p (> 0.5) of the Student t distribution, by bisection of its CDF so that scipy is not needed
+    low, high = 0.0, 1.0
+    while _t_cdf(high, df) < p:
+        low, high = high, high * 2
+    for _ in range(100):
+        middle = (low + high) / 2
+        if _t_cdf(middle, df) < p:
+            low = middle
+        else:
+            high = middle
+    return (low + high) / 2
+
+
+def mad_outliers(values, threshold=MAD_THRESHOLD):
+    # the values whose modified z-score is above threshold, none when the MAD is 0
+    values = np.asarray(values, dtype='float64')
+    median = np.median(values)
+    mad = np.median(np.abs(values - median))
+    if len(values) < 3 or mad == 0:
+        return np.zeros(len(values), dtype=bool)
+    return 0.6745 * np.abs(values - median) / mad > threshold
+
+
+def confidence_interval(values, confidence=0.95, method='t', seed=0):
+    # (low, high) of the confidence interval of the mean of the values, with the Student t
+    # distribution or with a percentile bootstrap (for few iterations that are not normal)
+    values = np.asarray(values, dtype='float64')
+    mean = values.mean()
+    if len(values) < 2:
+        return mean, mean
+    if method == 'bootstrap':
+        rng = np.random.default_rng(seed)
+        means = values[rng.integers(0, len(values), (N_BOOTSTRAP, len(values)))].mean(axis=1)
+        low, high = np.quantile(means, [(1 - confidence) / 2, (1 + confidence) / 2])
+        return low, high
+    half_width = t_quantile((1 + confidence) / 2, len(values) - 1) * values.std(ddof=1) / math.sqrt(len(values))
+    return mean - half_width, mean + half_width
+
+
+def iterations_needed(std, mean, target, confidence=0.95, max_iterations=1000):
+    # the smallest number of iterations whose t-based confidence interval of the mean is
+    # within +/- target * mean, for the standard deviation measured on the current iterations
+    if mean == 0 or np.isnan(std):
+        return np.nan
+    for n in range(2, max_iterations + 1):
+        if t_quantile((1 + confidence) / 2, n - 1) * std / math.sqrt(n) <= target * abs(mean):
+            return n
+    return np.nan
+
+
+def aggregate_iterations(df, groupby_cols=None, metrics=METRICS, confidence=0.95, method='t',
+                         reject_outliers=False, threshold=MAD_THRESHOLD):
+    # One row per point of the sweep. The other columns of result (per-operation latencies...)
+    # are averaged over the iterations. With reject_outliers, an iteration is dropped when it
+    # is an outlier for any of the metrics, e.g. a run where a handoff was still in progress
+    if groupby_cols is None:
+        groupby_cols = [col for col in POINT_COLS if col in df.columns]
+    rows = list()
+    for point, iterations in df.groupby(groupby_cols, sort=True):
+        point = point if isinstance(point, tuple) else (point,)
+        outliers = np.zeros(len(iterations), dtype=bool)
+        if reject_outliers:
+            for metric in metrics:
+                outliers |= mad_outliers(iterations[metric], threshold)
+        kept = iterations[~outliers]
+
+        row = dict(zip(groupby_cols, point))
+        row.update(kept.drop(columns=groupby_cols + ['iteration'], errors='ignore').mean(numeric_only=True))
+        row['n_iterations'] = len(kept)
+        row['n_outliers'] = int(outliers.sum())
+        if outliers.any() and 'iteration' in iterations.columns:
+            print(', '.join(f'{col}={value}' for col, value in zip(groupby_cols, point))
+                  + f': drop the iterations {iterations["iteration"][outliers].tolist()}')
+        for metric in metrics:
+            row[f'{metric}_median'] = kept[metric].median()
+            row[f'{metric}_std'] = kept[metric].std(ddof=1)
+            row[f'{metric}_ci_low'], row[f'{metric}_ci_high'] = confidence_interval(kept[metric], confidence, method)
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def iterations_report(df_agg, groupby_cols=None, metrics=METRICS, target=0.05, confidence=0.95):
+    # For each point and metric, the half width of the confidence interval relative to the mean
+    # and the number of iterations needed to get it within target
+    if groupby_cols is None:
+        groupby_cols = [col for col in POINT_COLS if col in df_agg.columns]
+    rows = list()
+    for point in df_agg.to_dict('records'):
+        for metric in metrics:
+            mean = point[metric]
+            rows.append({**{col: point[col] for col in groupby_cols},
+                         'metric': metric,
+                         'n_iterations': point['n_iterations'],
+                         'rel_ci': (point[f'{metric}_ci_high'] - point[f'{metric}_ci_low']) / 2 / abs(mean),
+                         'n_needed': iterations_needed(point[f'{metric}_std'], mean, target, confidence)})
+    return pd.DataFrame(rows)
+
+
+def main(result_path, confidence=0.95, method='t', reject_outliers=False, threshold=MAD_THRESHOLD,
+         target=0.05, fmt=None):
+    result_path = Path(result_path)
+    fmt = fmt or result_path.suffix[1:]
+    df = read_table(result_path)
+    df_agg = aggregate_iterations(df, confidence=confidence, method=method,
+                                  reject_outliers=reject_outliers, threshold=threshold)
+    write_table(df_agg, result_path.parent / 'aggregate', fmt)
+    print(f'Aggregated results: {df_agg}')
+
+    report = iterations_report(df_agg, target=target, confidence=confidence)
+    write_table(report, result_path.parent / 'iterations_needed', fmt)
+    print(f'\nIterations needed for a {confidence:.0%} confidence interval within +/-{target:.1%} of the mean:')
+    print(report.to_string(index=False))
+    for metric, needed in report.groupby('metric')['n_needed']:
+        print(f'{metric}: {needed.max():.0f} iterations cover every point')
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description='Aggregate the iterations of each point of result.csv')
+    # path to the result file written by process.py
+    parser.add_argument('result_path')
+    parser.add_argument('--confidence', type=float, default=0.95,
+                        help='the confidence level of the intervals')
+    parser.add_argument('--ci-method', dest='method', choices=CI_METHODS, default='t',
+                        help='compute the confidence intervals with the t distribution or by bootstrap')
+    parser.add_argument('--reject-outliers', action='store_true',
+                        help='drop the iterations whose throughput or latency is a MAD outlier')
+    parser.add_argument('--mad-threshold', dest='threshold', type=float, default=MAD_THRESHOLD,
+                        help='the modified z-score above which an iteration is an outlier')
+    parser.add_argument('--target-ci', dest='target', type=float, default=0.05,
+                        help='the half width of the confidence interval, relative to the mean, to reach')
+    parser.add_argument('--format', dest='fmt', choices=OUTPUT_FORMATS, default=None,
+                        help='the file format of the outputs, the one of result_path by default')
+    args = parser.parse_args()
+    main(args.result_path, confidence=args.confidence, method=args.method, reject_outliers=args.reject_outliers,
+         threshold=args.threshold, target=args.target, fmt=args.fmt)
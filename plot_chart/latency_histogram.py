@@ -0,0 +1,79 @@
+import numpy as np
+
+# lasp_bench summarizes the latencies of a window by these columns, they are the
+# quantiles below of the latencies of the window (min and max are the 0 and 1 quantiles)
+SUMMARY_COLS = ['min', 'median', '95th', '99th', '99_9th', 'max']
+SUMMARY_QUANTILES = np.array([0.0, 0.5, 0.95, 0.99, 0.999, 1.0])
+
+
+def histogram_edges(low, high, rel_error=0.01):
+    # Log-spaced bucket edges, as in HDR histograms: a bucket is at most 2 * rel_error wider
+    # than its lower edge, so a value read in a bucket is within rel_error of the true value.
+    # The values below low are counted in the first bucket, the ones above high in the last one
+    low = max(low, 1e-3)
+    high = max(high, low) * (1 + rel_error)
+    ratio = 1 + 2 * rel_error
+    n_buckets = int(np.ceil(np.log(high / low) / np.log(ratio)))
+    return low * ratio ** np.arange(n_buckets + 1)
+
+
+def _add_ramps(d2, d1, rows, positions, slopes):
+    # add slope * max(0, x - position) to the CDF of the rows, x being the index of an edge,
+    # through its second (d2) and first (d1) differences
+    starts = np.floor(positions).astype('int64')
+    np.add.at(d2, (rows, starts + 1), slopes)
+    np.add.at(d1, (rows, starts + 1), -slopes * (positions - starts))
+
+
+def merge_histograms(summaries, counts, keys, edges):
+    # Merge the latencies of the windows (a row of summaries, in SUMMARY_COLS order, and its count
+    # of requests) that share the same key into histograms, return (unique keys, histograms).
+    # The latencies of a window are assumed log-uniformly distributed between two consecutive
+    # quantiles of its summary (this fits the right-skewed latencies better than a uniform
+    # distribution). As the edges are log-spaced, the CDF of a window is then piecewise linear
+    # over the bucket indices: only its breakpoints are added (to the second differences of the
+    # CDF), so the cost does not depend on the number of buckets for each window
+    uniq_keys, inverse = np.unique(keys, return_inverse=True)
+    n_edges = len(edges)
+    # the positions of the quantiles of the summaries on the edges, in number of buckets
+    positions = np.log(np.maximum.accumulate(np.maximum(summaries, edges[0]), axis=1) / edges[0])
+    positions = np.minimum(positions / np.log(edges[1] / edges[0]), n_edges - 1)
+
+    d2 = np.zeros((len(uniq_keys), n_edges + 1))
+    d1 = np.zeros((len(uniq_keys), n_edges + 1))
+    for j in range(len(SUMMARY_QUANTILES) - 1):
+        mass = counts * (SUMMARY_QUANTILES[j + 1] - SUMMARY_QUANTILES[j])
+        low = positions[:, j]
+        high = positions[:, j + 1]
+        spread = high > low
+        slopes = mass[spread] / (high[spread] - low[spread])
+        _add_ramps(d2, d1, inverse[spread], low[spread], slopes)
+        _add_ramps(d2, d1, inverse[spread], high[spread], -slopes)
+        # a quantile range of width 0 is a step at its value
+        np.add.at(d1, (inverse[~spread], np.ceil(low[~spread]).astype('int64')), mass[~spread])
+
+    cdf = np.cumsum(np.cumsum(d2, axis=1) + d1, axis=1)[:, :n_edges]
+    # the latencies below the first edge are counted in the first bucket
+    cdf[:, 0] = 0
+    return uniq_keys, np.maximum(np.diff(cdf, axis=1), 0)
+
+
+def histogram_percentiles(histograms, edges, quantiles):
+    # the quantiles of every histogram (a row of histograms), linearly interpolated inside
+    # the bucket, NaN for an empty histogram
+    histograms = np.atleast_2d(histograms)
+    rows = np.arange(len(histograms))
+    cum = np.cumsum(histograms, axis=1)
+    total = cum[:, -1]
+    result = np.empty((len(histograms), len(quantiles)))
+    for k, quantile in enumerate(quantiles):
+        target = quantile * total
+        # the first bucket where the cumulative count reaches the target
+        idx = np.minimum((cum < target[:, None]).sum(axis=1), histograms.shape[1] - 1)
+        before = np.where(idx > 0, cum[rows, np.maximum(idx - 1, 0)], 0)
+        inside = histograms[rows, idx]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            frac = np.where(inside > 0, (target - before) / inside, 0)
+        result[:, k] = edges[idx] + np.clip(frac, 0, 1) * (edges[idx + 1] - edges[idx])
+    result[total <= 0] = np.nan
+    return result
@@ -3,7 +3,8 @@ import matplotlib.pyplot as plt
 from pathlib import Path
 import sys
 
-import pandas as pd
+from aggregate import aggregate_iterations
+from process import read_table
 
 plt.rcParams.update({'font.size': 30.0})
 
@@ -14,11 +15,14 @@ if len(sys.argv) >= 3:
 else:
     plot_by = 'n_nodes'
 
-df = pd.read_csv(result_path)
+
+df = read_table(result_path)
 groupby_cols = ['concurrent_clients', 'n_nodes']
-if plot_by != 'n_nodes':
+if plot_by != 'n_nodes' and (plot_by != 'operations' or 'n_dc' in df.columns):
     groupby_cols = ['n_dc'] + groupby_cols
-df = df.groupby(groupby_cols).mean().reset_index()
+if 'n_iterations' not in df.columns:
+    # result of process.py: aggregate its iterations, an aggregate file of aggregate.py is used as is
+    df = aggregate_iterations(df, groupby_cols)
 print(f'Plot data: {df}')
 
 
@@ -46,6 +50,15 @@ def plot(df, label, color, marker, linewidth=5, markersize=20, annotations=None,
              markeredgewidth=4,
              fillstyle='none',
              label=label)
+    if 'throughput_ci_low' in df.columns:
+        # the confidence intervals of the mean throughput and latency over the iterations
+        plt.errorbar(x, y,
+                     xerr=[x - df['throughput_ci_low'], df['throughput_ci_high'] - x],
+                     yerr=[y - df['latency_ci_low'], df['latency_ci_high'] - y],
+                     fmt='none',
+                     ecolor=color,
+                     elinewidth=linewidth / 2,
+                     capsize=markersize / 2)
     ax = plt.gca()
     ax.set_xticks(range(min_x, max_x + 1, 1000))
     ax.set_yticks(range(min_y, max_y + 1, 20))
@@ -59,9 +72,37 @@ def plot(df, label, color, marker, linewidth=5, markersize=20, annotations=None,
             # ax.annotate(text, (x.iloc[i] - 100, y.iloc[i] + 2))
 
 
+def plot_operations(df, linewidth=5, markersize=20):
+    # one curve per FMKe operation: the throughput of the operation and its
+    # mean latency (solid line) and 99th percentile latency (dashed line)
+    operations = sorted(col[:-len('_throughput')] for col in df.columns if col.endswith('_throughput'))
+    colors = plt.cm.tab10.colors
+    for i, operation in enumerate(operations):
+        x = df[f'{operation}_throughput']
+        color = colors[i % len(colors)]
+        plt.plot(x, df[f'{operation}_mean'],
+                 linewidth=linewidth,
+                 markersize=markersize,
+                 color=color,
+                 marker='o',
+                 markeredgewidth=4,
+                 fillstyle='none',
+                 label=operation)
+        plt.plot(x, df[f'{operation}_99th'], linewidth=linewidth / 2, linestyle='--', color=color)
+
+
 x_range = [2_000, 6_000]
 y_range = [0, 160]
-if plot_by == 'n_nodes':
+plot_name = 'plot.png'
+if plot_by == 'operations':
+    # the operations of one topology: the number of nodes given after the mode, or the largest one
+    n_nodes = int(sys.argv[3]) if len(sys.argv) >= 4 else df['n_nodes'].max()
+    df = df[df['n_nodes'] == n_nodes]
+    if 'n_dc' in df.columns:
+        df = df[df['n_dc'] == df['n_dc'].max()]
+    plot_operations(df)
+    plot_name = 'plot_operations.png'
+elif plot_by == 'n_nodes':
     plot(df[df['n_nodes'] == 6], "6 nodes (ring_size = 64)", "goldenrod", "X",
          x_range=x_range, y_range=y_range)
     plot(df[df['n_nodes'] == 9], "9 nodes (ring_size = 128)", "mediumblue", "d",
@@ -84,4 +125,4 @@ ax.set_ylabel("Latency (ms)")
 fig = plt.gcf()
 fig.set_size_inches(20.5, 12.5)
 plt.tight_layout()
-fig.savefig(result_path.parent / 'plot.png', format="png", dpi=300)
+fig.savefig(result_path.parent / plot_name, format="png", dpi=300)
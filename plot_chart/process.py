@@ -1,16 +1,44 @@
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+import hashlib
+import json
 import math
-import sys
+import os
 import warnings
 
+import numpy as np
 import pandas as pd
 
+try:
+    from latency_histogram import SUMMARY_COLS, histogram_edges, histogram_percentiles, merge_histograms
+    from steady_state import N_WINDOWS
+except ImportError:
+    # imported as plot_chart.process by the workflow to process the combinations as they are downloaded
+    from plot_chart.latency_histogram import SUMMARY_COLS, histogram_edges, histogram_percentiles, merge_histograms
+    from plot_chart.steady_state import N_WINDOWS
+
 warnings.filterwarnings('ignore')
 
-N_WINDOWS = 20
+LATENCY_COLS = ['min', 'mean', 'median', '95th', '99th', '99_9th', 'max']
+# the percentiles read from the merged latency histograms
+PERCENTILES = {'median': 0.5, '95th': 0.95, '99th': 0.99, '99_9th': 0.999}
+# the number of seconds whose histograms are merged at once, it bounds the memory of the histograms
+HISTOGRAM_BATCH = 1000
+# the latencies of each operation in result, the mean is weighted by the number of requests
+OPERATION_LATENCY_COLS = ['mean', '95th', '99th', '99_9th']
+# schema of the lasp_bench *_latencies.csv files, only these columns are loaded
+LATENCIES_DTYPES = {'elapsed': 'float64', 'window': 'float64', 'n': 'float64', 'errors': 'int64'}
+LATENCIES_DTYPES.update({col: 'float64' for col in LATENCY_COLS})
+
+# index file at the root of the results directory that keeps the result of every
+# processed combination, keyed on the fingerprint of its latency files
+CACHE_FILE = 'process_cache.json'
+CACHE_VERSION = 3
 
-# path to directory contains experiment results
-result_path = sys.argv[1]
+# the per-second table and the aggregated result are written in one of these formats,
+# parquet needs pyarrow (or fastparquet) and is compressed with zstd
+OUTPUT_FORMATS = ['csv', 'parquet']
 
 
 def _path_2_comb(comb_dir_name):
@@ -21,93 +49,355 @@ def _path_2_comb(comb_dir_name):
     return comb
 
 
-def calc_throughput_latency(path):
-    dfs = list()
-    result_dirpath = None
-    # for filepath in glob('*_latencies.csv'):
-    for filepath in Path(path).rglob('*_latencies.csv'):
-        operation_name = str(filepath).split('_latencies.csv')[0]
-        result_dirpath = filepath.parent
-        df = pd.read_csv(filepath)
-        df.columns = [col.strip() for col in df.columns.tolist()]
-        df = df[df['window'] >= 9].copy()
-        df['elapsed'] = df['elapsed'].apply(lambda x: int(math.floor(x)))
-        df['n'] = df['n'] / df['window']
-        for col in ['min', 'mean', 'median', '95th', '99th', '99_9th', 'max']:
-            # convert microseconds to milliseconds
-            df[col] = df[col].apply(lambda x: x / 1000)
-        dfs.append(df)
-    df = pd.concat(dfs)
+def read_table(path):
+    # the tables written by process.py (result, combine) are either csv or parquet files
+    if Path(path).suffix == '.parquet':
+        return pd.read_parquet(path)
+    return pd.read_csv(path)
+
+
+def write_table(df, filepath, fmt='csv'):
+    # filepath is given without extension, it is added according to the format
+    filepath = Path(filepath)
+    if fmt == 'parquet':
+        df.to_parquet(filepath.with_suffix('.parquet'), index=False, compression='zstd')
+    else:
+        df.to_csv(filepath.with_suffix('.csv'), index=False)
+
+
+def _read_latencies(filepath, chunksize=None):
+    # Yield the rows of a lasp_bench file with a full window, all at once or by chunks of
+    # chunksize rows. One typed read per file, the header has a space after each comma
+    reader = pd.read_csv(filepath,
+                         skipinitialspace=True,
+                         usecols=LATENCIES_DTYPES.keys(),
+                         dtype=LATENCIES_DTYPES,
+                         chunksize=chunksize)
+    for df in (reader if chunksize else [reader]):
+        df = df[df['window'] >= 9]
+        # count is the number of requests of the window, n the number of requests per second
+        df = df.assign(elapsed=np.floor(df['elapsed'].to_numpy()).astype('int64'),
+                       count=df['n'],
+                       n=df['n'] / df['window'])
+        # convert microseconds to milliseconds
+        df[LATENCY_COLS] = df[LATENCY_COLS] / 1000
+        yield df
+
+
+def _iter_latencies(filepaths, chunksize=None):
+    # Yield blocks [(operation, rows)] of the rows of the latency files, a block holds all the rows
+    # of its seconds. Without chunksize, there is a single block with all the rows. With chunksize,
+    # the files are read side by side by chunks of chunksize rows: as the rows of a file are ordered
+    # by elapsed, the seconds before the last second read in every file are complete and yielded,
+    # so only a few chunks per file are kept in memory, whatever the length of the run
+    operations = [filepath.name[:-len('_latencies.csv')] for filepath in filepaths]
+    if not chunksize:
+        yield [(operation, next(_read_latencies(filepath))) for operation, filepath in zip(operations, filepaths)]
+        return
+
+    readers = [_read_latencies(filepath, chunksize) for filepath in filepaths]
+    pending = [rows for rows in (next(reader, None) for reader in readers)]
+    while True:
+        unfinished = [k for k, rows in enumerate(pending) if readers[k] is not None]
+        if not unfinished:
+            break
+        # the file that is the least advanced gives the seconds that are complete
+        last_seconds = [(pending[k]['elapsed'].iloc[-1] if pending[k] is not None and len(pending[k])
+                         else -math.inf, k) for k in unfinished]
+        frontier, k_next = min(last_seconds)
+        block = list()
+        for k, rows in enumerate(pending):
+            if rows is None:
+                continue
+            complete = (rows['elapsed'] < frontier).to_numpy()
+            if complete.any():
+                block.append((operations[k], rows[complete]))
+                pending[k] = rows[~complete]
+        if block:
+            yield block
+
+        chunk = next(readers[k_next], None)
+        if chunk is None:
+            readers[k_next] = None
+        elif pending[k_next] is None:
+            pending[k_next] = chunk
+        else:
+            pending[k_next] = pd.concat([pending[k_next], chunk])
+    block = [(operations[k], rows) for k, rows in enumerate(pending) if rows is not None and len(rows)]
+    if block:
+        yield block
 
-    data = list()
-    for index, group in df.groupby('elapsed'):
-        t = {
-            'elapsed': index,
-            'n': group['n'].sum(),
-            'errors': group['errors'].sum()
-        }
-        for col in ['min', 'mean', 'median', '95th', '99th', '99_9th', 'max']:
-            t[col] = group[col].mean()
-        data.append(t)
 
-    df2 = pd.DataFrame(data)
+def _sum_by_key(keys, values):
+    # Sum the rows of values that share the same key. Each group is reduced with the
+    # same numpy summation as Series.sum() (pandas' groupby sum uses a compensated
+    # summation that changes the last digits), so the output stays byte-identical.
+    # Groups are bucketed by size, so there is one vectorized reduction per size.
+    order = np.argsort(keys, kind='stable')
+    uniq_keys, starts, sizes = np.unique(keys[order], return_index=True, return_counts=True)
+    values = values[order]
+    sums = np.empty((len(uniq_keys), values.shape[1]))
+    for size in np.unique(sizes):
+        groups = np.flatnonzero(sizes == size)
+        rows = starts[groups, None] + np.arange(size)
+        # (group, column, row) layout so the reduction runs over the contiguous axis
+        block = np.ascontiguousarray(values[rows].transpose(0, 2, 1))
+        sums[groups] = block.sum(axis=2)
+    return uniq_keys, sums, sizes
+
+
+def _per_second(df):
+    # sums, min and max of the rows of each second: n, errors, count (the number of requests),
+    # weighted_mean (the sum of the latencies), min and max of the windows with requests
+    sum_cols = ['n', 'errors', 'count', 'weighted_mean']
+    df = df.assign(weighted_mean=df['mean'] * df['count'])
+    elapsed, sums, _ = _sum_by_key(df['elapsed'].to_numpy(), df[sum_cols].to_numpy(dtype='float64'))
+    seconds = pd.DataFrame(sums, columns=sum_cols, index=pd.Index(elapsed, name='elapsed'))
+    non_empty = df[df['count'] > 0].groupby('elapsed')
+    seconds['min'] = non_empty['min'].min()
+    seconds['max'] = non_empty['max'].max()
+    return seconds
+
+
+def _accumulate_histograms(blocks, seconds, start_elapsed, edges):
+    # The percentiles of each second, read from the merged histograms of its windows, and the
+    # sums and the merged histogram of each operation after the measuring point. The histograms
+    # of the seconds are dropped once their percentiles are read
+    second_percentiles = np.full((len(seconds), len(PERCENTILES)), np.nan)
+    operation_sums = dict()
+    for block in blocks:
+        block = [(operation, rows[rows['count'] > 0]) for operation, rows in block]
+        rows = pd.concat([rows for _, rows in block], ignore_index=True)
+        order = np.argsort(rows['elapsed'].to_numpy(), kind='stable')
+        keys = rows['elapsed'].to_numpy()[order]
+        summaries = rows[SUMMARY_COLS].to_numpy(dtype='float64')[order]
+        counts = rows['count'].to_numpy()[order]
+        # the seconds are merged by batches of HISTOGRAM_BATCH seconds
+        uniq_keys = np.unique(keys)
+        bounds = np.searchsorted(keys, uniq_keys[::HISTOGRAM_BATCH].tolist() + [np.inf])
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            batch_keys, histograms = merge_histograms(summaries[start:end], counts[start:end],
+                                                      keys[start:end], edges)
+            second_percentiles[np.searchsorted(seconds, batch_keys)] = histogram_percentiles(
+                histograms, edges, list(PERCENTILES.values()))
+
+        for operation, rows in block:
+            rows = rows[rows['elapsed'] >= start_elapsed]
+            if len(rows) == 0:
+                continue
+            _, histograms = merge_histograms(rows[SUMMARY_COLS].to_numpy(dtype='float64'),
+                                             rows['count'].to_numpy(), np.zeros(len(rows)), edges)
+            sums = operation_sums.setdefault(operation, {'n': 0.0, 'count': 0.0, 'weighted_mean': 0.0,
+                                                         'histogram': np.zeros(len(edges) - 1)})
+            sums['n'] += rows['n'].sum()
+            sums['count'] += rows['count'].sum()
+            sums['weighted_mean'] += (rows['mean'] * rows['count']).sum()
+            sums['histogram'] += histograms[0]
+    return second_percentiles, operation_sums
+
+
+def calc_operations(operation_sums, n_seconds, edges):
+    # Throughput and latencies of each operation after the measuring point. The throughput is the
+    # mean number of requests per second, the mean latency is weighted by the number of requests
+    # of the files and seconds, and the percentiles are read from their merged histograms
+    operations = dict()
+    for operation, sums in operation_sums.items():
+        percentiles = histogram_percentiles(sums['histogram'], edges,
+                                            [PERCENTILES[col] for col in OPERATION_LATENCY_COLS[1:]])[0]
+        operations[operation] = dict(throughput=sums['n'] / n_seconds,
+                                     mean=sums['weighted_mean'] / sums['count'],
+                                     **dict(zip(OPERATION_LATENCY_COLS[1:], percentiles)))
+    return operations
+
+
+def calc_throughput_latency(path, fmt='csv', chunksize=None):
+    # With chunksize, the latency files are read twice by chunks of chunksize rows instead of being
+    # loaded at once: first for the throughput and the measuring point, then for the histograms.
+    # The rows of a second are still summed together, so the results are the same
+    filepaths = list(Path(path).rglob('*_latencies.csv'))
+    result_dirpath = filepaths[-1].parent
+    blocks = _iter_latencies(filepaths, chunksize)
+    if not chunksize:
+        # the single block is kept for the second pass
+        blocks = list(blocks)
+    seconds = pd.concat([_per_second(pd.concat([rows for _, rows in block], ignore_index=True))
+                         for block in blocks])
+
+    # Latencies of all the operations and FMKe clients in each second: the mean is weighted by
+    # the number of requests, the percentiles are read from the merged histograms of the windows
+    # (averaging the percentiles of the files would understate the tail latencies)
+    seconds = seconds[seconds['n'] > 0]
+    df2 = pd.DataFrame({'elapsed': seconds.index.to_numpy(),
+                        'n': seconds['n'].to_numpy(),
+                        'errors': seconds['errors'].to_numpy().astype('int64'),
+                        'min': seconds['min'].to_numpy(),
+                        'mean': (seconds['weighted_mean'] / seconds['count']).to_numpy()})
+    df2[list(PERCENTILES)] = np.nan
+    df2['max'] = seconds['max'].to_numpy()
 
     MA_col = f'n_MA{N_WINDOWS}'
-    df2 = df2[df2['n'] > 0]
     df2[MA_col] = df2['n'].rolling(window=N_WINDOWS).mean()
 
     # interpolate missing values
     alpha = df2['n'].max()
     beta = -math.log(df2[MA_col].iloc[N_WINDOWS - 1] / alpha) / (N_WINDOWS - 1)
-    for i in range(0, N_WINDOWS - 1):
-        df2[MA_col].iloc[i] = alpha * math.exp(-beta * i)
+    df2.iloc[:N_WINDOWS - 1, df2.columns.get_loc(MA_col)] = [alpha * math.exp(-beta * i)
+                                                            for i in range(0, N_WINDOWS - 1)]
 
     df2[f'{MA_col}_diff'] = df2[MA_col].diff(periods=1).rolling(window=N_WINDOWS).mean().abs()
 
     THRESHOLD = 0.7
     DIFF_THRESHOLD = df2[f'{MA_col}_diff'].tail(int(THRESHOLD * len(df2))).mean()
-    for i in range(0, len(df2)):
-        if df2[f'{MA_col}_diff'].iloc[i] <= DIFF_THRESHOLD:
-            break
+    # the first row below the threshold, or the last row if there is none
+    is_stable = (df2[f'{MA_col}_diff'] <= DIFF_THRESHOLD).to_numpy()
+    i = int(is_stable.argmax()) if is_stable.any() else len(df2) - 1
 
     print(f'measuring point: {i}')
 
     throughput = df2[MA_col][i:].mean()
     latency = df2['mean'][i:].mean()
 
-    df2.to_csv(result_dirpath / 'combine.csv', index=False)
-    return df2, throughput, latency
+    edges = histogram_edges(df2['min'].min(), df2['max'].max())
+    if chunksize:
+        blocks = _iter_latencies(filepaths, chunksize)
+    second_percentiles, operation_sums = _accumulate_histograms(blocks, df2['elapsed'].to_numpy(),
+                                                                df2['elapsed'].iloc[i], edges)
+    df2[list(PERCENTILES)] = second_percentiles
+    operations = calc_operations(operation_sums, len(df2) - i, edges)
+    # the percentiles of all the requests after the measuring point
+    steady_histogram = sum(sums['histogram'] for sums in operation_sums.values())
+    percentiles = dict(zip(PERCENTILES, histogram_percentiles(steady_histogram, edges,
+                                                              list(PERCENTILES.values()))[0]))
 
+    write_table(df2, result_dirpath / 'combine', fmt)
+    return df2, throughput, latency, i, operations, percentiles
 
-p = Path(result_path)
-df = pd.DataFrame([_path_2_comb(dirpath.name) for dirpath in p.iterdir()])
-df.dropna(subset=['iteration'], inplace=True)
-for col in df.columns:
-    try:
-        df = df.astype({col: int})
-    except ValueError:
-        print(col)
-        continue
-
-n_nodes_col = [col for col in df.columns if 'per_dc' in col and 'fmke' not in col][0]
-print(n_nodes_col)
-df['total_conn'] = df['n_fmke_client_per_dc'] * df['concurrent_clients']
-df.sort_values([n_nodes_col, 'total_conn'], inplace=True)
-
-has_dc_col = False
-if 'n_dc' in df.columns:
-    has_dc_col = True
-    df = df.astype({'n_dc': int})
-    df['total_conn'] = df['total_conn'] * df['n_dc']
-    df.sort_values(['n_dc', n_nodes_col, 'total_conn'], inplace=True)
-
-data = list()
-for index, row in df.iterrows():
-    print(f'Working on {row["dirname"]}')
+
+def process_comb(dirpath, fmt='csv', chunksize=None):
+    _, throughput, latency, measuring_point, operations, percentiles = calc_throughput_latency(str(dirpath), fmt,
+                                                                                             chunksize)
+    return throughput, latency, measuring_point, operations, percentiles
+
+
+def _fingerprint(dirpath):
+    # size and mtime of every latency file, a new or re-downloaded file changes the fingerprint
+    h = hashlib.sha1()
+    for filepath in sorted(dirpath.rglob('*_latencies.csv')):
+        stat = filepath.stat()
+        h.update(f'{filepath.relative_to(dirpath)}:{stat.st_size}:{stat.st_mtime_ns}\n'.encode())
+    return h.hexdigest()
+
+
+def _load_cache(p):
     try:
-        dirpath = p / row['dirname']
-        df2, throughput, latency = calc_throughput_latency(str(dirpath))
-        df2.to_csv(dirpath / 'final_combine.csv', index=False)
+        with open(p / CACHE_FILE) as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return dict()
+    if cache.get('version') != CACHE_VERSION:
+        return dict()
+    return cache['combs']
+
+
+def _save_cache(p, combs):
+    tmp_path = p / (CACHE_FILE + '.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump({'version': CACHE_VERSION, 'combs': combs}, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, p / CACHE_FILE)
+
+
+def _cache_entry(fingerprint, fmt, result):
+    throughput, latency, measuring_point, operations, percentiles = result
+    return {
+        'fingerprint': fingerprint,
+        'format': fmt,
+        'throughput': throughput,
+        'latency': latency,
+        'measuring_point': measuring_point,
+        'operations': operations,
+        'percentiles': percentiles,
+    }
+
+
+def process_and_cache(result_path, dirname, fmt='csv', chunksize=None):
+    # Process one combination and add its result to the cache of the results directory, so that
+    # the next run of process.py reuses it. Used by the workflow as soon as a combination is downloaded
+    p = Path(result_path)
+    result = process_comb(p / dirname, fmt, chunksize)
+    cache = _load_cache(p)
+    cache[dirname] = _cache_entry(_fingerprint(p / dirname), fmt, result)
+    _save_cache(p, cache)
+    return result
+
+
+def _run_combs(p, dirnames, jobs, fmt, chunksize=None):
+    # yield (dirname, the result of process_comb or the raised exception) in the given order
+    if jobs <= 1:
+        for dirname in dirnames:
+            print(f'Working on {dirname}')
+            try:
+                yield dirname, process_comb(p / dirname, fmt, chunksize)
+            except Exception as e:
+                yield dirname, e
+        return
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = list()
+        for dirname in dirnames:
+            print(f'Working on {dirname}')
+            futures.append((dirname, executor.submit(process_comb, p / dirname, fmt, chunksize)))
+        for dirname, future in futures:
+            try:
+                yield dirname, future.result()
+            except Exception as e:
+                yield dirname, e
+
+
+def main(result_path, jobs=1, use_cache=True, fmt='csv', chunksize=None):
+    p = Path(result_path)
+    df = pd.DataFrame([_path_2_comb(dirpath.name) for dirpath in p.iterdir()])
+    df.dropna(subset=['iteration'], inplace=True)
+    for col in df.columns:
+        try:
+            df = df.astype({col: int})
+        except ValueError:
+            print(col)
+            continue
+
+    n_nodes_col = [col for col in df.columns if 'per_dc' in col and 'fmke' not in col][0]
+    print(n_nodes_col)
+    df['total_conn'] = df['n_fmke_client_per_dc'] * df['concurrent_clients']
+    df.sort_values([n_nodes_col, 'total_conn'], inplace=True)
+
+    has_dc_col = False
+    if 'n_dc' in df.columns:
+        has_dc_col = True
+        df = df.astype({'n_dc': int})
+        df['total_conn'] = df['total_conn'] * df['n_dc']
+        df.sort_values(['n_dc', n_nodes_col, 'total_conn'], inplace=True)
+
+    rows = {row['dirname']: row for _, row in df.iterrows()}
+    fingerprints = {dirname: _fingerprint(p / dirname) for dirname in rows}
+    cache = _load_cache(p) if use_cache else dict()
+    cache = {dirname: cached for dirname, cached in cache.items()
+             if dirname in rows and cached['fingerprint'] == fingerprints[dirname]
+             and cached.get('format', 'csv') == fmt}
+    results = dict(_run_combs(p, [dirname for dirname in rows if dirname not in cache], jobs, fmt, chunksize))
+
+    data = list()
+    for dirname, row in rows.items():
+        if dirname in results:
+            result = results[dirname]
+            if isinstance(result, Exception):
+                print(f'--> Exception {result} on {dirname}')
+                continue
+            throughput, latency, measuring_point, operations, percentiles = result
+            cache[dirname] = _cache_entry(fingerprints[dirname], fmt, result)
+        else:
+            print(f'Reuse the cached result of {dirname}')
+            throughput, latency = cache[dirname]['throughput'], cache[dirname]['latency']
+            operations = cache[dirname]['operations']
+            percentiles = cache[dirname]['percentiles']
         cur_data = {
             'n_nodes': int(row[n_nodes_col]),
             'concurrent_clients': row['total_conn'],
@@ -115,15 +405,36 @@ for index, row in df.iterrows():
             'throughput': throughput,
             'latency': latency,
         }
+        for col in ['95th', '99th', '99_9th']:
+            cur_data[f'latency_{col}'] = percentiles[col]
         if has_dc_col:
             cur_data['n_dc'] = int(row['n_dc'])
+        for operation, values in sorted(operations.items()):
+            for col in ['throughput'] + OPERATION_LATENCY_COLS:
+                cur_data[f'{operation}_{col}'] = values[col]
         data.append(cur_data)
-    except Exception as e:
-        print(f'--> Exception {e} on {row["dirname"]}')
-
-df_final = pd.DataFrame(data)
-df_final.sort_values(['n_nodes', 'concurrent_clients', 'iteration'], inplace=True)
-if has_dc_col:
-    df_final.sort_values(['n_dc', 'n_nodes', 'concurrent_clients', 'iteration'], inplace=True)
-df_final.to_csv(p / 'result.csv', index=False)
-print(f'\nResults: {df_final}')
+
+    df_final = pd.DataFrame(data)
+    df_final.sort_values(['n_nodes', 'concurrent_clients', 'iteration'], inplace=True, kind='mergesort')
+    if has_dc_col:
+        df_final.sort_values(['n_dc', 'n_nodes', 'concurrent_clients', 'iteration'],
+                             inplace=True, kind='mergesort')
+    write_table(df_final, p / 'result', fmt)
+    _save_cache(p, cache)
+    print(f'\nResults: {df_final}')
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description='Calculate the throughput and latency of each combination')
+    # path to directory contains experiment results
+    parser.add_argument('result_path')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='the number of combination directories processed in parallel')
+    parser.add_argument('--no-cache', dest='use_cache', action='store_false',
+                        help='process every combination again instead of reusing %s' % CACHE_FILE)
+    parser.add_argument('--format', dest='fmt', choices=OUTPUT_FORMATS, default='csv',
+                        help='the file format of the per-second tables and of the final result')
+    parser.add_argument('--chunksize', type=int, default=None,
+                        help='read the latency files by chunks of this number of rows to bound the memory')
+    args = parser.parse_args()
+    main(args.result_path, jobs=args.jobs, use_cache=args.use_cache, fmt=args.fmt, chunksize=args.chunksize)
@@ -0,0 +1,112 @@
+from argparse import ArgumentParser
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from aggregate import aggregate_iterations
+from process import OUTPUT_FORMATS, read_table, write_table
+
+# the columns that identify a topology, its points are the numbers of concurrent clients
+TOPOLOGY_COLS = ['n_dc', 'n_nodes']
+
+
+def find_knee(throughputs, latencies):
+    # Index of the knee of a throughput-latency curve (points in the order of the load) with the
+    # Kneedle method: both axes are scaled to [0, 1] and the knee is the point that is the furthest
+    # below the line from the first to the last point, where the latency starts to grow faster than
+    # the throughput. None when there are less than 3 points or the curve has no knee
+    x = np.asarray(throughputs, dtype='float64')
+    y = np.asarray(latencies, dtype='float64')
+    if len(x) < 3 or np.ptp(x) == 0 or np.ptp(y) == 0:
+        return None
+    x = (x - x.min()) / np.ptp(x)
+    y = (y - y.min()) / np.ptp(y)
+    # the distance to the line from the first point to the last point
+    distances = (x - x[0]) * (y[-1] - y[0]) - (y - y[0]) * (x[-1] - x[0])
+    knee = int(distances.argmax())
+    if distances[knee] <= 0:
+        return None
+    return knee
+
+
+def analyze_topology(curve, slo_col, slo):
+    # the knee, the peak and the maximum throughput under the SLO of a curve sorted by load
+    throughputs = curve['throughput'].to_numpy()
+    result = {'n_points': len(curve)}
+    knee = find_knee(throughputs, curve['latency'].to_numpy())
+    result['knee_concurrent_clients'] = curve['concurrent_clients'].iloc[knee] if knee is not None else np.nan
+    result['knee_throughput'] = throughputs[knee] if knee is not None else np.nan
+    result['knee_latency'] = curve['latency'].iloc[knee] if knee is not None else np.nan
+
+    peak = int(throughputs.argmax())
+    result['peak_concurrent_clients'] = curve['concurrent_clients'].iloc[peak]
+    result['peak_throughput'] = throughputs[peak]
+    result['peak_latency'] = curve['latency'].iloc[peak]
+
+    # the highest measured throughput whose latency meets the SLO
+    meets_slo = (curve[slo_col] <= slo).to_numpy() if slo is not None else np.ones(len(curve), dtype=bool)
+    if meets_slo.any():
+        best = int(np.where(meets_slo, throughputs, -np.inf).argmax())
+        result['slo_concurrent_clients'] = curve['concurrent_clients'].iloc[best]
+        result['slo_throughput'] = throughputs[best]
+        result[f'slo_{slo_col}'] = curve[slo_col].iloc[best]
+    else:
+        result['slo_concurrent_clients'] = np.nan
+        result['slo_throughput'] = np.nan
+        result[f'slo_{slo_col}'] = np.nan
+    return result
+
+
+def analyze(df, slo_col='latency_99th', slo=None):
+    # one row per topology with its knee, peak and maximum throughput under the SLO
+    if 'n_iterations' not in df.columns:
+        df = aggregate_iterations(df)
+    topology_cols = [col for col in TOPOLOGY_COLS if col in df.columns]
+    rows = list()
+    for topology, curve in df.groupby(topology_cols, sort=True):
+        topology = topology if isinstance(topology, tuple) else (topology,)
+        curve = curve.sort_values('concurrent_clients')
+        rows.append({**dict(zip(topology_cols, topology)), **analyze_topology(curve, slo_col, slo)})
+    return pd.DataFrame(rows)
+
+
+def scaling_efficiency(df_saturation, throughput_col='peak_throughput'):
+    # The throughput per Riak node of each topology, relative to the one of the smallest topology:
+    # 1 means that the throughput grows linearly with the number of nodes
+    df = df_saturation[[col for col in TOPOLOGY_COLS if col in df_saturation.columns]].copy()
+    # n_nodes is the number of RiakKV nodes per DC
+    df['total_nodes'] = df['n_nodes'] * (df_saturation['n_dc'] if 'n_dc' in df.columns else 1)
+    df['throughput'] = df_saturation[throughput_col]
+    df['throughput_per_node'] = df['throughput'] / df['total_nodes']
+    base = df.sort_values(['total_nodes'], kind='mergesort').iloc[0]
+    df['speedup'] = df['throughput'] / base['throughput']
+    df['scaling_efficiency'] = df['throughput_per_node'] / base['throughput_per_node']
+    return df
+
+
+def main(result_path, slo_col='latency_99th', slo=None, fmt=None):
+    result_path = Path(result_path)
+    fmt = fmt or result_path.suffix[1:]
+    df_saturation = analyze(read_table(result_path), slo_col, slo)
+    write_table(df_saturation, result_path.parent / 'saturation', fmt)
+    print(f'Saturation points: {df_saturation.to_string(index=False)}')
+
+    # the sustainable throughput is the one under the SLO when there is one, the peak otherwise
+    df_scaling = scaling_efficiency(df_saturation, 'slo_throughput' if slo is not None else 'peak_throughput')
+    write_table(df_scaling, result_path.parent / 'scaling', fmt)
+    print(f'\nScaling efficiency: {df_scaling.to_string(index=False)}')
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description='Find the saturation point of each topology of result.csv')
+    # path to the result file of process.py or to the aggregate file of aggregate.py
+    parser.add_argument('result_path')
+    parser.add_argument('--slo', type=float, default=None,
+                        help='the latency SLO in ms, the maximum throughput of each topology is the one under it')
+    parser.add_argument('--slo-metric', dest='slo_col', default='latency_99th',
+                        help='the latency column of result.csv that the SLO applies to')
+    parser.add_argument('--format', dest='fmt', choices=OUTPUT_FORMATS, default=None,
+                        help='the file format of the outputs, the one of result_path by default')
+    args = parser.parse_args()
+    main(args.result_path, slo_col=args.slo_col, slo=args.slo, fmt=args.fmt)
@@ -0,0 +1,128 @@
+import math
+from collections import deque
+
+# the number of samples of the moving average of the throughput
+N_WINDOWS = 20
+
+
+class SteadyStateDetector(object):
+    # Online version of the measuring point detection of process.py.
+    # Samples (elapsed, n) are given one at a time, in the order of elapsed. The throughput
+    # is smoothed with a moving average over n_windows samples, and the measuring point is
+    # the first sample where the mean change of this moving average over the last n_windows
+    # samples drops below rel_threshold * moving average. The offline version compares it
+    # with the mean change of the whole run, which is not known while the run is going on.
+    # Only the last n_windows values are kept, so the memory does not grow with the run.
+
+    def __init__(self, n_windows=N_WINDOWS, rel_threshold=0.005, min_steady_seconds=600):
+        self.n_windows = n_windows
+        self.rel_threshold = rel_threshold
+        self.min_steady_seconds = min_steady_seconds
+
+        self._samples = deque(maxlen=n_windows)
+        self._moving_averages = deque(maxlen=n_windows + 1)
+        self.n_samples = 0
+        self.last_elapsed = None
+        self.moving_average = None
+
+        self.measuring_point = None
+        self._steady_sum = 0.0
+        self._steady_count = 0
+
+    def update(self, elapsed, n):
+        # add the throughput n measured at elapsed, return True when enough stable seconds are collected
+        self.n_samples += 1
+        self.last_elapsed = elapsed
+        self._samples.append(n)
+        if len(self._samples) < self.n_windows:
+            return False
+
+        self.moving_average = sum(self._samples) / self.n_windows
+        self._moving_averages.append(self.moving_average)
+
+        if self.measuring_point is None and len(self._moving_averages) > self.n_windows:
+            # mean of the last n_windows differences of the moving average
+            change = abs(self._moving_averages[-1] - self._moving_averages[0]) / self.n_windows
+            if change <= self.rel_threshold * self.moving_average:
+                self.measuring_point = elapsed
+
+        if self.measuring_point is not None:
+            self._steady_sum += self.moving_average
+            self._steady_count += 1
+        return self.is_stable
+
+    @property
+    def steady_seconds(self):
+        if self.measuring_point is None:
+            return 0
+        return self.last_elapsed - self.measuring_point
+
+    @property
+    def is_stable(self):
+        return self.measuring_point is not None and self.steady_seconds >= self.min_steady_seconds
+
+    @property
+    def throughput(self):
+        # mean of the moving average since the measuring point, as in process.py
+        if self._steady_count == 0:
+            return None
+        return self._steady_sum / self._steady_count
+
+
+class RunningStats(object):
+    # mean and variance of a stream of values with Welford's algorithm
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    def update(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+
+    @property
+    def variance(self):
+        if self.count < 2:
+            return 0.0
+        return self._m2 / (self.count - 1)
+
+    def rel_error(self, z=1.96):
+        # half width of the confidence interval of the mean, relative to the mean
+        if self.count < 2 or self.mean == 0:
+            return float('inf')
+        return z * math.sqrt(self.variance / self.count) / abs(self.mean)
+
+
+class BatchMeans(object):
+    # Confidence interval of the mean of an autocorrelated series, e.g. the throughput of consecutive
+    # seconds, with the method of batch means: the values are grouped in batches of batch_size
+    # consecutive values, the means of batches longer than the correlation time are nearly
+    # independent, and the interval is the one of the mean of the batch means. There is no
+    # interval before min_batches batches are complete
+
+    def __init__(self, batch_size=30, min_batches=10):
+        self.batch_size = batch_size
+        self.min_batches = min_batches
+        self.batches = RunningStats()
+        self._batch_sum = 0.0
+        self._batch_count = 0
+
+    def update(self, value):
+        self._batch_sum += value
+        self._batch_count += 1
+        if self._batch_count == self.batch_size:
+            self.batches.update(self._batch_sum / self.batch_size)
+            self._batch_sum = 0.0
+            self._batch_count = 0
+
+    @property
+    def mean(self):
+        return self.batches.mean
+
+    def rel_error(self, z=1.96):
+        if self.batches.count < self.min_batches:
+            return float('inf')
+        return self.batches.rel_error(z)
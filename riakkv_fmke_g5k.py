@@ -1,8 +1,22 @@
 import os
+import copy
+import csv
+import json
+import glob
+import hashlib
+import math
 import shutil
+import subprocess
+import tarfile
+import tempfile
 import traceback
 import re
-from time import sleep
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from functools import partial, wraps
+from queue import Empty, Queue
+from threading import Event, Lock, Thread
+from time import sleep, time
 
 from cloudal.utils import get_logger, execute_cmd, parse_config_file, getput_file, ExecuteCommandException
 from cloudal.action import performing_actions_g5k
@@ -12,16 +26,441 @@ from cloudal.experimenter import create_paramsweeper, define_parameters, is_job_
 
 from execo_g5k import oardel
 from execo_engine import slugify
-from kubernetes import config
+from kubernetes import config, client, watch
+from kubernetes.client.rest import ApiException
 import yaml
 
+from plot_chart.steady_state import SteadyStateDetector, BatchMeans
+
 logger = get_logger()
 
+# the data directory of RiakKV inside its container and the storage backends that can be found there
+RIAK_DATA_DIR = '/var/lib/riak'
+RIAK_BACKENDS = ['bitcask', 'leveldb']
+# the hostPath volume of the RiakKV pods where the data snapshots are stored
+RIAK_SNAPSHOT_HOST_DIR = '/tmp/riakkv_snapshots'
+RIAK_SNAPSHOT_POD_DIR = '/riakkv-snapshots'
+# the counters of riak-admin status collected during the stress phase
+RIAK_STATUS_KEYS = ['vnode_gets', 'vnode_puts', 'vnode_gets_total', 'vnode_puts_total',
+                    'node_gets', 'node_puts', 'node_gets_total', 'node_puts_total', 'read_repairs',
+                    'node_get_fsm_time_mean', 'node_get_fsm_time_median', 'node_get_fsm_time_95',
+                    'node_get_fsm_time_99', 'node_get_fsm_time_100',
+                    'node_put_fsm_time_mean', 'node_put_fsm_time_median', 'node_put_fsm_time_95',
+                    'node_put_fsm_time_99', 'node_put_fsm_time_100']
+# the directory on the RiakKV and FMKe nodes where node_metrics.sh writes its samples
+NODE_METRICS_DIR = '/tmp/metrics'
+# the waiting reasons of a container that does not go away without an action, a pod in one of them fails the wait
+POD_FAILURE_REASONS = ['CrashLoopBackOff', 'ImagePullBackOff', 'ErrImagePull', 'InvalidImageName',
+                       'CreateContainerConfigError', 'CreateContainerError']
+# the maximum duration of a watch before the resources are listed again, in seconds
+WATCH_RESYNC = 30
+# the seconds during which a listing of Kubernetes resources by label is reused
+K8S_CACHE_TTL = 30
+# the extension of the archive of the results on the FMKe nodes and its compression command, by compression
+RESULTS_COMPRESSIONS = {'gzip': ('.gz', 'gzip -1'), 'zstd': ('.zst', 'zstd -q -T0'), 'none': ('', 'cat')}
+
 
 class CancelCombException(Exception):
     pass
 
 
+def wait_until(condition, description, timeout=600, interval=5, max_interval=60):
+    # check the condition with an exponential backoff until it holds or the timeout is reached
+    logger.debug('Waiting until %s' % description)
+    deadline = time() + timeout
+    while True:
+        try:
+            if condition():
+                return True
+        except ExecuteCommandException as e:
+            logger.debug('Checking if %s failed: %s' % (description, e))
+        remaining = deadline - time()
+        if remaining <= 0:
+            logger.warning('Timeout after %s seconds waiting until %s' % (timeout, description))
+            return False
+        sleep(min(interval, remaining))
+        interval = min(interval * 2, max_interval)
+
+
+class K8sSession(object):
+    # The Kubernetes API connections and resource listings shared by all the steps and node pools.
+    # The kubernetes client and cloudal's configurator create a new connection pool for each call,
+    # here the listings, the watches and the deletions use one long-lived ApiClient, so their
+    # connections to the API server are reused. The listings of pods, services, jobs and nodes by
+    # label are kept for ttl seconds: the deployments and deletions through the session clear the
+    # listings of their namespace, the new labels clear the listings of nodes. The other calls
+    # (execute_command, get_k8s_pod_log, deploy_k8s_resources...) go to one cloudal configurator,
+    # which still opens a new connection for each of them
+
+    # the list method of the API of each resource, the nodes are not namespaced
+    LIST_METHODS = {'pod': ('core_v1', 'list_namespaced_pod'),
+                    'service': ('core_v1', 'list_namespaced_service'),
+                    'job': ('batch_v1', 'list_namespaced_job'),
+                    'node': ('core_v1', 'list_node')}
+
+    def __init__(self, ttl=K8S_CACHE_TTL):
+        self.ttl = ttl
+        self._lock = Lock()
+        self.reset()
+
+    def reset(self):
+        # drop the connections and the listings, e.g. when the kube config is loaded again
+        with self._lock:
+            self._apis = dict()
+            self._listings = dict()
+            self._configurator = None
+
+    def _api(self, name, api_class):
+        with self._lock:
+            if 'api_client' not in self._apis:
+                # the configuration is the one loaded by config.load_kube_config
+                self._apis['api_client'] = client.ApiClient()
+            if name not in self._apis:
+                self._apis[name] = api_class(self._apis['api_client'])
+            return self._apis[name]
+
+    @property
+    def core_v1(self):
+        return self._api('core_v1', client.CoreV1Api)
+
+    @property
+    def batch_v1(self):
+        return self._api('batch_v1', client.BatchV1Api)
+
+    @property
+    def apps_v1(self):
+        return self._api('apps_v1', client.AppsV1Api)
+
+    @property
+    def configurator(self):
+        with self._lock:
+            if self._configurator is None:
+                self._configurator = k8s_resources_configurator()
+            return self._configurator
+
+    def __getattr__(self, name):
+        return getattr(self.configurator, name)
+
+    def _listing_key(self, resource, label_selectors, kube_namespace):
+        return resource, label_selectors, None if resource == 'node' else kube_namespace
+
+    def get_k8s_resources(self, resource, label_selectors='', kube_namespace='default', cached=True):
+        # the list of the resources matching the label selectors, a listing younger than ttl
+        # seconds is reused unless cached is False (to see the changes while waiting for them)
+        if resource not in self.LIST_METHODS:
+            return self.configurator.get_k8s_resources(resource=resource, label_selectors=label_selectors,
+                                                       kube_namespace=kube_namespace)
+        key = self._listing_key(resource, label_selectors, kube_namespace)
+        with self._lock:
+            listing = self._listings.get(key)
+        if cached and listing and time() - listing[0] <= self.ttl:
+            return listing[1]
+
+        api, method = self.LIST_METHODS[resource]
+        list_method = getattr(getattr(self, api), method)
+        if resource == 'node':
+            result = list_method(label_selector=label_selectors)
+        else:
+            result = list_method(kube_namespace, label_selector=label_selectors)
+        self.store(resource, label_selectors, kube_namespace, result)
+        return result
+
+    def get_k8s_resources_name(self, resource, label_selectors='', kube_namespace='default', cached=True):
+        return [item.metadata.name for item in self.get_k8s_resources(resource, label_selectors,
+                                                                      kube_namespace, cached).items]
+
+    def store(self, resource, label_selectors, kube_namespace, result):
+        # keep a listing made elsewhere, e.g. the pods seen by wait_k8s_ready
+        with self._lock:
+            self._listings[self._listing_key(resource, label_selectors, kube_namespace)] = (time(), result)
+
+    def invalidate(self, kube_namespace=None, resource=None):
+        # forget the listings of the namespace (all of them when None) and of the resource (all of them when None)
+        with self._lock:
+            for key in list(self._listings):
+                if (kube_namespace is None or key[2] == kube_namespace) and resource in (None, key[0]):
+                    del self._listings[key]
+
+    def deploy_k8s_resources(self, files=None, path=None, namespace='default'):
+        try:
+            return self.configurator.deploy_k8s_resources(files=files, path=path, namespace=namespace)
+        finally:
+            self.invalidate(namespace)
+
+    def create_namespace(self, namespace):
+        try:
+            return self.configurator.create_namespace(namespace=namespace)
+        finally:
+            self.invalidate(namespace)
+
+    def delete_namespace(self, namespace):
+        try:
+            return self.configurator.delete_namespace(namespace)
+        finally:
+            self.invalidate(namespace)
+
+    def set_labels_node(self, **kwargs):
+        try:
+            return self.configurator.set_labels_node(**kwargs)
+        finally:
+            self.invalidate(resource='node')
+
+
+k8s_session = K8sSession()
+
+
+def _pod_failure(pod):
+    # the reason why a container of the pod cannot start or keeps crashing, None when there is none
+    statuses = (pod.status.init_container_statuses or list()) + (pod.status.container_statuses or list())
+    for status in statuses:
+        waiting = status.state.waiting if status.state else None
+        if waiting and waiting.reason in POD_FAILURE_REASONS:
+            return '%s (%s)' % (waiting.reason, waiting.message or 'container %s' % status.name)
+    return None
+
+
+def _is_pod_ready(pod):
+    if pod.status.phase == 'Succeeded':
+        return True
+    return pod.status.phase == 'Running' and any(condition.type == 'Ready' and condition.status == 'True'
+                                                 for condition in pod.status.conditions or list())
+
+
+def _job_condition(job):
+    # Complete or Failed when the job is finished, None while it is running
+    for condition in job.status.conditions or list():
+        if condition.type in ('Complete', 'Failed') and condition.status == 'True':
+            return condition.type
+    return None
+
+
+def wait_k8s_ready(resource, label_selectors, kube_namespace='default', timeout=300, n_expected=None):
+    # Wait with the watch API until n_expected pods matching the label selectors are ready, or until
+    # n_expected jobs are complete, and return the ready pods or the names of the complete jobs, or
+    # None after the timeout. When n_expected is None, all the pods (at least one) must be ready, or
+    # no job must be left unfinished (as cloudal's wait_k8s_resources).
+    # The pods are watched in both cases: a pod that cannot start (ImagePullBackOff, CrashLoopBackOff...)
+    # raises CancelCombException at once, and the jobs are listed again when one of their pods finishes.
+    # A job is complete as soon as its pod succeeded, as the job can be deleted a few seconds after it
+    # completes (ttlSecondsAfterFinished), before it is listed again.
+    # A watch lasts at most WATCH_RESYNC seconds, then the resources are listed again. The last state
+    # of the pods is kept as the listing of the label selectors of k8s_session
+    logger.debug('Waiting until %s %ss with labels "%s" are ready' % (n_expected or 'all', resource, label_selectors))
+    core_v1 = k8s_session.core_v1
+    batch_v1 = k8s_session.batch_v1
+    # the names of the jobs seen since the start of the wait, and of the ones seen complete
+    seen_jobs = set()
+    completed_jobs = set()
+
+    def check_jobs(pods):
+        for pod in pods.values():
+            job_name = (pod.metadata.labels or dict()).get('job-name')
+            if job_name:
+                seen_jobs.add(job_name)
+                if pod.status.phase == 'Succeeded':
+                    completed_jobs.add(job_name)
+        n_unfinished = 0
+        for job in batch_v1.list_namespaced_job(kube_namespace, label_selector=label_selectors).items:
+            seen_jobs.add(job.metadata.name)
+            condition = _job_condition(job)
+            if condition == 'Failed':
+                raise CancelCombException('Job %s failed' % job.metadata.name)
+            if condition == 'Complete':
+                completed_jobs.add(job.metadata.name)
+            elif job.metadata.name not in completed_jobs:
+                n_unfinished += 1
+        if n_expected is None:
+            return n_unfinished == 0
+        # a job that is seen but not listed anymore was deleted after it finished
+        return len(completed_jobs) >= n_expected or (n_unfinished == 0 and len(seen_jobs) >= n_expected)
+
+    def check(pods):
+        for pod in pods.values():
+            failure = _pod_failure(pod)
+            if failure:
+                raise CancelCombException('Pod %s cannot run: %s' % (pod.metadata.name, failure))
+        if resource == 'job':
+            return sorted(completed_jobs) if check_jobs(pods) else None
+        items = list(pods.values())
+        ready = [pod for pod in items if _is_pod_ready(pod)]
+        if ready and len(ready) >= (n_expected if n_expected is not None else len(items)):
+            k8s_session.store('pod', label_selectors, kube_namespace, client.V1PodList(items=items))
+            return ready
+        return None
+
+    deadline = time() + timeout
+    while True:
+        listing = core_v1.list_namespaced_pod(kube_namespace, label_selector=label_selectors)
+        pods = {pod.metadata.name: pod for pod in listing.items}
+        ready = check(pods)
+        if ready is not None:
+            return ready
+        remaining = deadline - time()
+        if remaining <= 0:
+            logger.debug('Timeout after %s seconds waiting for the %ss with labels "%s"'
+                         % (timeout, resource, label_selectors))
+            return None
+
+        stream = watch.Watch()
+        try:
+            for event in stream.stream(core_v1.list_namespaced_pod, kube_namespace,
+                                       label_selector=label_selectors,
+                                       resource_version=listing.metadata.resource_version,
+                                       timeout_seconds=max(1, int(min(remaining, WATCH_RESYNC)))):
+                if event['type'] == 'ERROR':
+                    # the resource version is too old (410 Gone), list again
+                    break
+                pod = event['object']
+                previous = pods.pop(pod.metadata.name, None)
+                if event['type'] != 'DELETED':
+                    pods[pod.metadata.name] = pod
+                # the jobs only change when one of their pods finishes
+                finished = pod.status.phase in ('Succeeded', 'Failed') and (
+                    previous is None or previous.status.phase != pod.status.phase)
+                if resource == 'job' and not finished and not _pod_failure(pod):
+                    continue
+                ready = check(pods)
+                if ready is not None:
+                    return ready
+        except ApiException as e:
+            if e.status != 410:
+                raise
+        finally:
+            stream.stop()
+
+
+def run_concurrently(tasks, max_workers=16):
+    # run the independent tasks {name: function} in a thread pool and return {name: result},
+    # all the tasks are run even if some of them fail, then the failures are raised together
+    results = dict()
+    errors = dict()
+    if not tasks:
+        return results
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(tasks))) as executor:
+        futures = {executor.submit(func): name for name, func in tasks.items()}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                logger.error('Task "%s" failed: %s' % (name, e))
+                errors[name] = e
+    if errors:
+        raise CancelCombException('%s task(s) failed: %s' % (len(errors), ', '.join(sorted(errors))))
+    return results
+
+
+class PhaseTimer(object):
+    # Record the wall time of the steps of one combination as spans. The name of a span
+    # is prefixed by the names of its enclosing spans, e.g. deploy_riakkv/create_rings.
+    # The enclosing spans are tracked for the main thread only: a concurrent task gives the
+    # name of its parent explicitly, e.g. span('join', parent='deploy_riakkv/create_rings/econome')
+
+    def __init__(self):
+        self.started = time()
+        self.spans = list()
+        self._stack = list()
+        self._lock = Lock()
+
+    def current(self):
+        # the full name of the innermost span opened from the main thread
+        return '/'.join(self._stack)
+
+    @contextmanager
+    def span(self, name, parent=None):
+        if parent is None:
+            self._stack.append(name)
+            full_name = self.current()
+        else:
+            full_name = '%s/%s' % (parent, name)
+        start = time()
+        # the spans are kept in the order they are opened
+        span = {'name': full_name, 'start': round(start - self.started, 3),
+                'duration': None, 'ok': False}
+        with self._lock:
+            self.spans.append(span)
+        try:
+            yield
+            span['ok'] = True
+        finally:
+            if parent is None:
+                self._stack.pop()
+            span['duration'] = round(time() - start, 3)
+
+    def to_dict(self):
+        return {'total': round(time() - self.started, 3), 'spans': self.spans}
+
+
+class ResultPipeline(object):
+    # Run the jobs given by submit() with worker in a background thread, one after the other, while the
+    # main thread goes on. At most max_pending jobs wait in the queue, submit() blocks beyond that. The
+    # outcome of the jobs is reported back to the main thread by finished(), as (job, True/False)
+
+    def __init__(self, worker, max_pending=1):
+        self._worker = worker
+        self._jobs = Queue(maxsize=max_pending)
+        self._outcomes = Queue()
+        self._thread = Thread(target=self._run, name='result_pipeline')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            job = self._jobs.get()
+            try:
+                self._worker(job)
+                self._outcomes.put((job, True))
+            except Exception as e:
+                logger.error('Background job failed: %s' % e, exc_info=True)
+                self._outcomes.put((job, False))
+            finally:
+                self._jobs.task_done()
+
+    def submit(self, job):
+        self._jobs.put(job)
+
+    def join(self):
+        # wait until all the submitted jobs are finished
+        self._jobs.join()
+
+    def finished(self):
+        # the outcomes of the jobs finished since the last call
+        outcomes = list()
+        while True:
+            try:
+                outcomes.append(self._outcomes.get_nowait())
+            except Empty:
+                return outcomes
+
+
+class LockedSweeper(object):
+    # the sweeper shared by the node pools, its methods are called by one pool at a time
+
+    def __init__(self, sweeper):
+        self._sweeper = sweeper
+        self._lock = Lock()
+
+    def __getattr__(self, name):
+        attr = getattr(self._sweeper, name)
+        if not callable(attr):
+            return attr
+
+        @wraps(attr)
+        def locked(*args, **kwargs):
+            with self._lock:
+                return attr(*args, **kwargs)
+        return locked
+
+
+def timed(method):
+    # record the method as a span of the timer of the current combination
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.timer.span(method.__name__):
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
 class FMKe_riakkv_g5k(performing_actions_g5k):
     def __init__(self, **kwargs):
         super(FMKe_riakkv_g5k, self).__init__()
@@ -32,29 +471,234 @@ class FMKe_riakkv_g5k(performing_actions_g5k):
         self.args_parser.add_argument("--setup-k8s-env", dest="setup_k8s_env",
                                       help="create namespace, setup label and volume for kube_workers for the experiment environment",
                                       action="store_true")
-
+        # the RiakKV cluster deployed by the previous combination, to be reused
+        self.deployed_riakkv = None
+        # the snapshots of populated RiakKV data stored on the RiakKV nodes, by topology
+        self.riakkv_snapshots = dict()
+        # the timings of the steps of the current combination
+        self.timer = PhaseTimer()
+        # the local directory of the metrics collected during the stress phase of the current combination
+        self.collected_metrics = None
+        # the background worker that downloads and processes the results in the pipelined mode
+        self.result_pipeline = None
+        # the node pool of this engine in the node pools mode, None when it uses all the nodes
+        self.pool = None
+        # the engines of the node pools, created once the environment is set up
+        self.pool_engines = None
+        # the summary files of results_dir are updated by the result pipeline and the node pools
+        self._summary_lock = Lock()
+
+    def _node_labels(self, service):
+        # the labels of the nodes of the service, restricted to the node pool of this engine if any
+        labels = {'service_g5k': service}
+        if self.pool:
+            labels['pool_g5k'] = self.pool
+        return labels
+
+    def _node_selector(self, service, **labels):
+        # the label selector of the nodes of the service, with the extra labels
+        labels = dict(self._node_labels(service), **labels)
+        return ','.join('%s=%s' % (key, val) for key, val in sorted(labels.items()))
+
+    @timed
     def save_results(self, comb, pop_time):
+        comb_dir = self._save_results(comb, pop_time, '/tmp/results', self.collected_metrics, self.timer)
+        self.collected_metrics = None
+        return comb_dir
+
+    def _save_results(self, comb, pop_time, remote_dir, collected_metrics, timer):
+        # download the results of remote_dir on the FMKe client nodes and move the collected metrics
+        # to the result directory of the combination, the steps are recorded in timer
         logger.info("----------------------------------")
         logger.info("6. Starting dowloading the results")
 
-        configurator = k8s_resources_configurator()
+        configurator = k8s_session
         results_nodes = configurator.get_k8s_resources_name(resource='node',
-                                                            label_selectors='service_g5k=fmke')
+                                                            label_selectors=self._node_selector('fmke'))
 
-        comb_dir = get_results(comb=comb,
-                               hosts=results_nodes,
-                               remote_result_files=['/tmp/results/*'],
-                               local_result_dir=self.configs['exp_env']['results_dir'])
+        transfer = self.configs['exp_env'].get('result_transfer') or dict()
+        if transfer.get('enable', False):
+            comb_dir = self._download_results(comb, results_nodes, transfer, remote_dir, timer)
+        else:
+            comb_dir = get_results(comb=comb,
+                                   hosts=results_nodes,
+                                   remote_result_files=['%s/*' % remote_dir],
+                                   local_result_dir=self.configs['exp_env']['results_dir'])
 
         with open(os.path.join(comb_dir, 'pop_time.txt'), 'w') as f:
             f.write(pop_time)
 
+        if collected_metrics:
+            metrics_dir = os.path.join(comb_dir, 'metrics')
+            if os.path.exists(metrics_dir):
+                shutil.rmtree(metrics_dir)
+            shutil.move(collected_metrics, metrics_dir)
+
         logger.info("Finish dowloading the results")
+        return comb_dir
 
+    def _stage_results(self, comb):
+        # move the results of the combination aside on the FMKe client nodes, so that the next
+        # combination starts with an empty /tmp/results while they are downloaded
+        remote_dir = '/tmp/results_%s' % slugify(comb)
+        configurator = k8s_session
+        results_nodes = configurator.get_k8s_resources_name(resource='node',
+                                                            label_selectors=self._node_selector('fmke'))
+        execute_cmd('rm -rf %s && mv /tmp/results %s && mkdir -p /tmp/results' % (remote_dir, remote_dir),
+                    results_nodes)
+        return remote_dir, results_nodes
+
+    def _submit_results(self, comb, stress_comb, pop_time):
+        # hand the download and the processing of the results over to the result pipeline
+        with self.timer.span('stage_results'):
+            remote_dir, results_nodes = self._stage_results(stress_comb)
+        job = {'engine': self,
+               'comb': comb,
+               'stress_comb': stress_comb,
+               'pop_time': pop_time,
+               'remote_dir': remote_dir,
+               'results_nodes': results_nodes,
+               'collected_metrics': self.collected_metrics,
+               # the timer is only used by the result pipeline from now on
+               'timer': self.timer}
+        self.collected_metrics = None
+        logger.info('Handing the results of %s over to the result pipeline' % slugify(stress_comb))
+        self.result_pipeline.submit(job)
+
+    def _collect_results(self, job):
+        # The job of the result pipeline: download the staged results of a combination, process them
+        # as process.py does and save the timings of the combination. An exception cancels the combination
+        timer = job['timer']
+        comb_dir = None
+        comb_ok = False
+        try:
+            with timer.span('save_results'):
+                comb_dir = self._save_results(job['stress_comb'], job['pop_time'], job['remote_dir'],
+                                              job['collected_metrics'], timer)
+            comb_ok = True
+            if (self.configs['exp_env'].get('pipeline') or dict()).get('process', True):
+                self._process_results(comb_dir, timer)
+        finally:
+            try:
+                self._save_timings(job['comb'], comb_dir, comb_ok, timer)
+            except (IOError, OSError, ValueError) as e:
+                logger.warning('Cannot save the timings of the combination: %s' % e)
+            if job['collected_metrics'] and os.path.exists(job['collected_metrics']):
+                shutil.rmtree(job['collected_metrics'], ignore_errors=True)
+            try:
+                execute_cmd('rm -rf %s' % job['remote_dir'], job['results_nodes'])
+            except ExecuteCommandException as e:
+                logger.warning('Cannot delete the staged results %s: %s' % (job['remote_dir'], e))
+
+    def _process_results(self, comb_dir, timer):
+        # compute the throughput and latency of the combination and keep them in the cache of
+        # process.py, the results are kept even if they cannot be processed
+        with timer.span('process'):
+            try:
+                # pandas is only needed by the workflow in the pipelined mode
+                from plot_chart.process import process_and_cache
+                process_and_cache(self.configs['exp_env']['results_dir'], os.path.basename(comb_dir))
+            except Exception as e:
+                logger.warning('Cannot process the results in %s: %s' % (comb_dir, e))
+
+    def _report_collected_results(self, sweeper, wait=False):
+        # report the combinations whose results are collected by the result pipeline to the sweeper,
+        # a combination whose results cannot be collected is canceled and run again later
+        if not self.result_pipeline:
+            return
+        if wait:
+            self.result_pipeline.join()
+        for job, comb_ok in self.result_pipeline.finished():
+            if comb_ok:
+                sweeper.done(job['comb'])
+                logger.info('Finish combination: %s' % slugify(job['comb']))
+            else:
+                sweeper.cancel(job['comb'])
+                logger.warning(slugify(job['comb']) + ' is canceled')
+
+    def _archive_results(self, results_nodes, transfer, remote_dir):
+        # archive and compress remote_dir on every FMKe node (in parallel) with the sha256
+        # checksum of the archive, return the path of the archive on the nodes
+        compression = transfer.get('compression', 'gzip')
+        archive = remote_dir + '_archive.tar' + RESULTS_COMPRESSIONS[compression][0]
+        if transfer.get('latency_files_only', False):
+            select = "find . -type f \\( -name '*_latencies.csv' -o -name 'summary.csv' \\) | tar -cf - -T -"
+        else:
+            select = 'tar -cf - .'
+        cmd = 'cd %s && %s | %s > %s && sha256sum %s > %s.sha256' % (
+            remote_dir, select, RESULTS_COMPRESSIONS[compression][1], archive, archive, archive)
+        execute_cmd(cmd, results_nodes)
+        return archive
+
+    def _fetch_results_archive(self, host, archive, host_dir, compression, retries=1):
+        # download the archive of a node and its checksum to host_dir, then extract the archive
+        # there, the download is retried when the checksum does not match
+        archive_path = os.path.join(host_dir, os.path.basename(archive))
+        for attempt in range(retries + 1):
+            getput_file(hosts=[host], file_paths=[archive, archive + '.sha256'],
+                        dest_location=host_dir, action='get')
+            with open(archive_path + '.sha256') as f:
+                expected = f.read().split()[0]
+            sha256 = hashlib.sha256()
+            with open(archive_path, 'rb') as f:
+                for block in iter(partial(f.read, 1 << 20), b''):
+                    sha256.update(block)
+            if sha256.hexdigest() == expected:
+                break
+            logger.warning('The checksum of the results of %s does not match (attempt %s)' % (host, attempt + 1))
+        else:
+            raise CancelCombException('Cannot download the results of %s' % host)
 
+        if compression == 'zstd':
+            subprocess.check_call(['tar', '-I', 'zstd', '-xf', archive_path, '-C', host_dir])
+        else:
+            with tarfile.open(archive_path, 'r:*') as tar:
+                tar.extractall(host_dir)
+        os.remove(archive_path)
+        os.remove(archive_path + '.sha256')
+
+    def _download_results(self, comb, results_nodes, transfer, remote_dir, timer):
+        # The same result directory as get_results (one folder per FMKe node), but the results of
+        # each node are archived and compressed on the node and all the nodes are downloaded
+        # concurrently, instead of copying the raw files of one node after the other
+        comb_dir = os.path.join(self.configs['exp_env']['results_dir'], slugify(comb))
+        if not os.path.exists(comb_dir):
+            os.mkdir(comb_dir)
+        compression = transfer.get('compression', 'gzip')
+        with timer.span('archive'):
+            archive = self._archive_results(results_nodes, transfer, remote_dir)
+
+        tasks = dict()
+        for host in results_nodes:
+            host_dir = os.path.join(comb_dir, host.split('.')[0])
+            if not os.path.exists(host_dir):
+                os.mkdir(host_dir)
+            tasks[host] = partial(self._fetch_results_archive, host, archive, host_dir, compression)
+        with timer.span('download'):
+            run_concurrently(tasks, max_workers=transfer.get('parallel', 16))
+        execute_cmd('rm -f %s %s.sha256' % (archive, archive), results_nodes)
+        return comb_dir
+
+
+    @timed
     def deploy_fmke_client(self, kube_namespace, comb):
         logger.info('-----------------------------------------------------------------')
         logger.info('5. Starting deploying FMKe client')
+        test_duration = self.configs['exp_env']['test_duration']
+        fmke_client_files = self._create_fmke_client_files(kube_namespace, comb, test_duration)
+
+        metrics = self.configs['exp_env'].get('metrics') or dict()
+        collector = None
+        if metrics.get('enable', False):
+            collector = self._start_metrics_collection(kube_namespace, metrics.get('interval', 5))
+        try:
+            self._stress_fmke_client(kube_namespace, comb, fmke_client_files, test_duration, collector)
+        finally:
+            if collector:
+                self.collected_metrics = self._stop_metrics_collection(collector)
+
+    def _create_fmke_client_files(self, kube_namespace, comb, test_duration):
+        # create and upload the config file of one FMKe client per FMKe pod, return the yaml files of the clients
         fmke_client_k8s_dir = self.configs['exp_env']['fmke_yaml_path']
 
         logger.debug('Delete old k8s yaml files if exists')
@@ -66,15 +710,12 @@ class FMKe_riakkv_g5k(performing_actions_g5k):
                     except OSError:
                         logger.debug("Error while deleting file")
 
-        test_duration = self.configs['exp_env']['test_duration']
-
         logger.debug('Create the new workload ratio')
         workload = ",\n".join(["  {%s, %s}" % (key, val)
                                for key, val in self.configs['exp_env']['operations'].items()])
         operations = "{operations,[\n%s\n]}." % workload
 
-        logger.debug("Init configurator: k8s_resources_configurator")
-        configurator = k8s_resources_configurator()
+        configurator = k8s_session
         fmke_list = configurator.get_k8s_resources(resource='pod',
                                                    label_selectors='app=fmke',
                                                    kube_namespace=kube_namespace)
@@ -109,36 +750,451 @@ class FMKe_riakkv_g5k(performing_actions_g5k):
             doc['metadata']['name'] = 'fmke-client-%s' % node
             doc['spec']['template']['spec']['containers'][0]['lifecycle']['postStart']['exec']['command'] = [
                 "cp", "/cluster_node/fmke_client_%s.config" % node, "/fmke_client/fmke_client.config"]
-            doc['spec']['template']['spec']['nodeSelector'] = {
-                'service_g5k': 'fmke', 'kubernetes.io/hostname': '%s' % fmke.spec.node_name}
+            doc['spec']['template']['spec']['nodeSelector'] = dict(self._node_labels('fmke'), **{
+                'kubernetes.io/hostname': '%s' % fmke.spec.node_name})
             file_path = os.path.join(fmke_client_k8s_dir, 'create_fmke_client_%s.yaml' % node)
             with open(file_path, 'w') as f:
                 yaml.safe_dump(doc, f)
             fmke_client_files.append(file_path)
+        return fmke_client_files
 
+    def _stress_fmke_client(self, kube_namespace, comb, fmke_client_files, test_duration, collector=None,
+                            use_early_stop=True):
+        configurator = k8s_session
         logger.info("Starting FMKe client instances on each RiakKV DC")
         configurator.deploy_k8s_resources(files=fmke_client_files, namespace=kube_namespace)
-        sleep(20)
+        n_fmke_client = comb['n_fmke_client_per_dc'] * len(self.configs['exp_env']['clusters'])
         logger.info("Checking if deploying enough the number of running FMKe client or not")
-        fmke_client_list = configurator.get_k8s_resources_name(resource='pod',
-                                                            label_selectors='app=fmke-client',
-                                                            kube_namespace=kube_namespace)
-        if len(fmke_client_list) != comb['n_fmke_client_per_dc'] * len(self.configs['exp_env']['clusters']):
+        fmke_client_list = wait_k8s_ready(resource='pod',
+                                          label_selectors='app=fmke-client',
+                                          timeout=120,
+                                          kube_namespace=kube_namespace,
+                                          n_expected=n_fmke_client) or list()
+        if len(fmke_client_list) != n_fmke_client:
             logger.info("n_fmke_client = %s, n_deployed_fmke_client = %s" %
                         (comb['n_fmke_client_per_dc']*len(self.configs['exp_env']['clusters']), len(fmke_client_list)))
             raise CancelCombException("Cannot deploy enough FMKe_client")
+        if collector:
+            collector['stress_start'] = self._get_fmke_client_start(kube_namespace)
 
         logger.info("Stressing database in %s minutes ....." % test_duration)
-        deploy_ok = configurator.wait_k8s_resources(resource='job',
-                                        label_selectors="app=fmke-client",
-                                        timeout=(test_duration + 5)*60,
-                                        kube_namespace=kube_namespace)
+        early_stop = self.configs['exp_env'].get('early_stop') or dict()
+        if use_early_stop and early_stop.get('enable', False):
+            deploy_ok = self._wait_fmke_client_early_stop(kube_namespace, test_duration, early_stop)
+        else:
+            deploy_ok = wait_k8s_ready(resource='job',
+                                       label_selectors="app=fmke-client",
+                                       timeout=(test_duration + 5)*60,
+                                       kube_namespace=kube_namespace,
+                                       n_expected=len(fmke_client_files)) is not None
         if not deploy_ok:
             logger.error("Cannot wait until all FMKe client instances running completely")
             raise CancelCombException("Cannot wait until all FMKe client instances running completely")
 
         logger.info("Finish stressing RiakKV database")
 
+    def _pull_latency_files(self, results_nodes, local_dir):
+        # copy the current latency files of the FMKe client nodes to local_dir/<host>/
+        logger.debug('Pulling the current latency files from the FMKe client nodes')
+        cmd = '''rm -rf /tmp/live_results && mkdir -p /tmp/live_results &&
+                 find /tmp/results -name "*_latencies.csv" -exec cp {} /tmp/live_results/ \\;'''
+        execute_cmd(cmd, results_nodes)
+        for host in results_nodes:
+            host_dir = os.path.join(local_dir, host)
+            if not os.path.exists(host_dir):
+                os.mkdir(host_dir)
+            getput_file(hosts=[host], file_paths=['/tmp/live_results/*'],
+                        dest_location=host_dir, action='get')
+
+    def _read_live_latencies(self, local_dir):
+        # aggregate the latency files pulled from the fmke nodes per second and return [(elapsed, n,
+        # mean latency in ms)] of the seconds that all files have reached, the mean latency is weighted
+        # by the number of requests of the windows as in process.py
+        per_second = dict()
+        last_elapsed = list()
+        for file_path in glob.glob(os.path.join(local_dir, '*', '*_latencies.csv')):
+            elapsed = None
+            with open(file_path) as f:
+                for row in csv.DictReader(f, skipinitialspace=True):
+                    try:
+                        window = float(row['window'])
+                        elapsed = int(math.floor(float(row['elapsed'])))
+                        count = float(row['n'])
+                        mean = float(row['mean']) / 1000
+                    except (KeyError, TypeError, ValueError):
+                        # the last line can be incomplete while the client is writing it
+                        continue
+                    if window < 9:
+                        continue
+                    t = per_second.setdefault(elapsed, [0.0, 0.0, 0.0])
+                    t[0] += count / window
+                    t[1] += mean * count
+                    t[2] += count
+            if elapsed is not None:
+                last_elapsed.append(elapsed)
+        if not last_elapsed:
+            return list()
+        return [(elapsed, t[0], t[1] / t[2]) for elapsed, t in sorted(per_second.items())
+                if elapsed < min(last_elapsed) and t[2] > 0]
+
+    def _wait_fmke_client_early_stop(self, kube_namespace, test_duration, early_stop):
+        # Poll the latency files of the running FMKe clients and stop the clients when the
+        # throughput is stable and the confidence intervals of the mean throughput and mean
+        # latency are narrower than max_rel_error, or wait until the clients finish as usual.
+        # The consecutive seconds are correlated, the intervals are computed from the means
+        # of batches of batch_seconds seconds
+        check_interval = early_stop.get('check_interval', 60)
+        max_rel_error = early_stop.get('max_rel_error', 0.02)
+        batch_seconds = early_stop.get('batch_seconds', 30)
+        detector = SteadyStateDetector(rel_threshold=early_stop.get('rel_threshold', 0.005),
+                                       min_steady_seconds=early_stop.get('min_steady_seconds', 600))
+        throughput_stats = BatchMeans(batch_seconds)
+        latency_stats = BatchMeans(batch_seconds)
+
+        configurator = k8s_session
+        results_nodes = configurator.get_k8s_resources_name(resource='node',
+                                                            label_selectors=self._node_selector('fmke'))
+        local_dir = tempfile.mkdtemp(prefix='fmke_live_results_')
+        max_checks = int(math.ceil((test_duration + 5) * 60.0 / check_interval))
+        try:
+            for _ in range(max_checks):
+                if wait_k8s_ready(resource='job',
+                                  label_selectors="app=fmke-client",
+                                  timeout=check_interval,
+                                  kube_namespace=kube_namespace) is not None:
+                    return True
+
+                self._pull_latency_files(results_nodes, local_dir)
+                for elapsed, n, latency in self._read_live_latencies(local_dir):
+                    if detector.last_elapsed is not None and elapsed <= detector.last_elapsed:
+                        continue
+                    detector.update(elapsed, n)
+                    if detector.measuring_point is not None:
+                        throughput_stats.update(n)
+                        latency_stats.update(latency)
+
+                logger.info('Early stop check: measuring point = %s s, steady = %s s, '
+                            'throughput rel_error = %.4f, latency rel_error = %.4f' %
+                            (detector.measuring_point, detector.steady_seconds,
+                             throughput_stats.rel_error(), latency_stats.rel_error()))
+                if (detector.is_stable and throughput_stats.rel_error() <= max_rel_error
+                        and latency_stats.rel_error() <= max_rel_error):
+                    logger.info('Throughput and latency are stable, stopping the FMKe clients after %s s'
+                                % detector.last_elapsed)
+                    k8s_session.batch_v1.delete_collection_namespaced_job(namespace=kube_namespace,
+                                                                          label_selector='app=fmke-client',
+                                                                          propagation_policy='Background')
+                    k8s_session.invalidate(kube_namespace)
+                    return True
+        finally:
+            shutil.rmtree(local_dir, ignore_errors=True)
+        return False
+
+    def _read_probe_latencies(self, local_dir, warmup):
+        # the throughput (requests per second) and the 99th percentile latency (ms) after warmup seconds
+        # of the latency files pulled from the fmke nodes, the percentile is read from the merged
+        # histograms of the windows as in process.py
+        # numpy is only needed by the workflow in the load search mode
+        import numpy as np
+        from plot_chart.latency_histogram import SUMMARY_COLS, histogram_edges, histogram_percentiles, merge_histograms
+
+        per_second = dict()
+        summaries = list()
+        counts = list()
+        for file_path in glob.glob(os.path.join(local_dir, '*', '*_latencies.csv')):
+            with open(file_path) as f:
+                for row in csv.DictReader(f, skipinitialspace=True):
+                    try:
+                        window = float(row['window'])
+                        elapsed = int(math.floor(float(row['elapsed'])))
+                        count = float(row['n'])
+                        summary = [float(row[col]) / 1000 for col in SUMMARY_COLS]
+                    except (KeyError, TypeError, ValueError):
+                        continue
+                    if window < 9 or elapsed < warmup:
+                        continue
+                    per_second[elapsed] = per_second.get(elapsed, 0.0) + count / window
+                    if count > 0:
+                        summaries.append(summary)
+                        counts.append(count)
+        if not counts:
+            return None, None
+        summaries = np.array(summaries)
+        edges = histogram_edges(summaries[:, 0].min(), summaries[:, -1].max())
+        _, histograms = merge_histograms(summaries, np.array(counts), np.zeros(len(counts)), edges)
+        latency_99th = float(histogram_percentiles(histograms, edges, [0.99])[0][0])
+        return sum(per_second.values()) / len(per_second), latency_99th
+
+    def _clean_fmke_clients(self, kube_namespace):
+        # delete the FMKe client jobs and their results, the FMKe app and the RiakKV cluster are kept
+        k8s_session.batch_v1.delete_collection_namespaced_job(namespace=kube_namespace,
+                                                              label_selector='app=fmke-client',
+                                                              propagation_policy='Background')
+        k8s_session.invalidate(kube_namespace)
+        configurator = k8s_session
+
+        def is_fmke_client_deleted():
+            return len(configurator.get_k8s_resources_name(resource='pod', label_selectors='app=fmke-client',
+                                                           kube_namespace=kube_namespace, cached=False)) == 0
+
+        if not wait_until(is_fmke_client_deleted, 'all FMKe client pods are deleted', timeout=300):
+            raise CancelCombException("Cannot delete the FMKe clients of the probe")
+        results_nodes = configurator.get_k8s_resources_name(resource='node',
+                                                            label_selectors=self._node_selector('fmke'))
+        execute_cmd('rm -rf /tmp/results && mkdir -p /tmp/results', results_nodes)
+
+    def _run_load_probe(self, kube_namespace, comb, concurrent_clients, load_search):
+        # stress the database for probe_duration minutes with the given concurrency and
+        # return its throughput and 99th percentile latency
+        probe_comb = dict(comb, concurrent_clients=concurrent_clients)
+        probe_duration = load_search.get('probe_duration', 3)
+        logger.info('Probing %s concurrent clients per FMKe client for %s minutes' %
+                    (concurrent_clients, probe_duration))
+        with self.timer.span('probe_%s' % concurrent_clients):
+            fmke_client_files = self._create_fmke_client_files(kube_namespace, probe_comb, probe_duration)
+            self._stress_fmke_client(kube_namespace, probe_comb, fmke_client_files, probe_duration,
+                                     use_early_stop=False)
+            configurator = k8s_session
+            results_nodes = configurator.get_k8s_resources_name(resource='node',
+                                                                label_selectors=self._node_selector('fmke'))
+            local_dir = tempfile.mkdtemp(prefix='fmke_probe_results_')
+            try:
+                self._pull_latency_files(results_nodes, local_dir)
+                throughput, latency_99th = self._read_probe_latencies(local_dir,
+                                                                      load_search.get('probe_warmup', 60))
+            finally:
+                shutil.rmtree(local_dir, ignore_errors=True)
+            self._clean_fmke_clients(kube_namespace)
+        if latency_99th is None:
+            raise CancelCombException('No latency is measured by the probe of %s concurrent clients'
+                                      % concurrent_clients)
+        logger.info('Probe of %s concurrent clients: throughput = %.1f ops/s, p99 latency = %.1f ms' %
+                    (concurrent_clients, throughput, latency_99th))
+        return {'concurrent_clients': concurrent_clients,
+                'throughput': throughput,
+                'latency_99th': latency_99th,
+                'meets_slo': latency_99th <= load_search['slo']}
+
+    def _get_load_search_key(self, comb):
+        # the iterations of a topology share the result of its load search
+        return slugify({key: val for key, val in comb.items() if key != 'iteration'})
+
+    def _search_load(self, kube_namespace, comb, load_search):
+        # Find the highest concurrency per FMKe client whose p99 latency meets the SLO with short
+        # probe rounds: the concurrency is doubled from min_concurrent_clients until the SLO is
+        # violated, then binary searched until the bounds are within tolerance. Return None when
+        # even min_concurrent_clients violates the SLO. The result of the search of a topology is
+        # kept in load_search.json and reused by its other iterations
+        summary_path = os.path.join(self.configs['exp_env']['results_dir'], 'load_search.json')
+        summary = self._read_load_search(summary_path)
+        key = self._get_load_search_key(comb)
+        if key in summary and summary[key]['slo'] == load_search['slo']:
+            logger.info('Reusing the load search of %s: %s concurrent clients' %
+                        (key, summary[key]['concurrent_clients']))
+            return summary[key]['concurrent_clients']
+
+        min_clients = load_search.get('min_concurrent_clients', 8)
+        max_clients = load_search.get('max_concurrent_clients', 1024)
+        tolerance = load_search.get('tolerance', 0.1)
+        max_probes = load_search.get('max_probes', 12)
+        probes = list()
+
+        def meets_slo(concurrent_clients):
+            probes.append(self._run_load_probe(kube_namespace, comb, concurrent_clients, load_search))
+            return probes[-1]['meets_slo']
+
+        with self.timer.span('load_search'):
+            low, high = None, None
+            concurrent_clients = min_clients
+            while len(probes) < max_probes:
+                if not meets_slo(concurrent_clients):
+                    high = concurrent_clients
+                    break
+                low = concurrent_clients
+                if concurrent_clients >= max_clients:
+                    break
+                concurrent_clients = min(concurrent_clients * 2, max_clients)
+            while (low is not None and high is not None and high - low > 1
+                   and high > low * (1 + tolerance) and len(probes) < max_probes):
+                concurrent_clients = min(max(int(round(math.sqrt(low * high))), low + 1), high - 1)
+                if meets_slo(concurrent_clients):
+                    low = concurrent_clients
+                else:
+                    high = concurrent_clients
+
+        if low is None:
+            logger.warning('The p99 latency of %s concurrent clients is above the SLO of %s ms' %
+                           (min_clients, load_search['slo']))
+        else:
+            logger.info('Load search: %s concurrent clients per FMKe client meet the SLO of %s ms (%s probes)' %
+                        (low, load_search['slo'], len(probes)))
+        with self._summary_lock:
+            summary = self._read_load_search(summary_path)
+            summary[key] = {'slo': load_search['slo'], 'concurrent_clients': low, 'probes': probes}
+            with open(summary_path, 'w') as f:
+                json.dump(summary, f, indent=2, sort_keys=True)
+        return low
+
+    def _read_load_search(self, summary_path):
+        if not os.path.exists(summary_path):
+            return dict()
+        with open(summary_path) as f:
+            return json.load(f)
+
+    def _read_riak_status(self, pod_name, kube_namespace):
+        # return the RIAK_STATUS_KEYS counters of riak-admin status on the pod
+        configurator = k8s_session
+        output = configurator.execute_command(pod_name=pod_name,
+                                              command='riak-admin status',
+                                              kube_namespace=kube_namespace)
+        status = dict()
+        for line in output.split('\n'):
+            key, _, value = line.partition(' : ')
+            if key.strip() in RIAK_STATUS_KEYS:
+                status[key.strip()] = value.strip()
+        return status
+
+    def _sample_riak_status(self, collector, kube_namespace):
+        # Runs in the background thread of the metrics collection until it is stopped. A round is
+        # skipped while a request of the previous round is still running, so that the requests do
+        # not pile up in the executor when a round takes longer than the interval
+        futures = list()
+        while not collector['stop'].is_set():
+            timestamp = time()
+            if any(not future.done() for future in futures):
+                logger.debug('The previous riak-admin status round is not finished, skipping this one')
+            else:
+                futures = [collector['executor'].submit(self._append_riak_status, collector, pod_name,
+                                                        timestamp, kube_namespace)
+                           for pod_name in collector['riak_pods']]
+            collector['stop'].wait(max(0, collector['interval'] - (time() - timestamp)))
+
+    def _append_riak_status(self, collector, pod_name, timestamp, kube_namespace):
+        try:
+            status = self._read_riak_status(pod_name, kube_namespace)
+        except Exception as e:
+            # a missing sample must not cancel the combination
+            logger.debug('Cannot read the status of %s: %s' % (pod_name, e))
+            return
+        status['timestamp'] = timestamp
+        collector['riak_status'][pod_name].append(status)
+
+    def _start_metrics_collection(self, kube_namespace, interval):
+        logger.info('Starting collecting the metrics of the RiakKV and FMKe nodes every %s seconds' % interval)
+        configurator = k8s_session
+        hosts = list()
+        for service in ['riakkv', 'fmke']:
+            hosts += configurator.get_k8s_resources_name(resource='node',
+                                                         label_selectors=self._node_selector(service))
+        riak_pods = configurator.get_k8s_resources_name(resource='pod',
+                                                        label_selectors='app=riakkv',
+                                                        kube_namespace=kube_namespace)
+
+        script = os.path.join(self.configs['exp_env']['monitoring_yaml_path'], 'node_metrics.sh')
+        execute_cmd('rm -rf %s && mkdir -p %s' % (NODE_METRICS_DIR, NODE_METRICS_DIR), hosts)
+        getput_file(hosts=hosts, file_paths=[script], dest_location=NODE_METRICS_DIR, action='put')
+        # the pid of the sampler is kept to stop it, a pkill -f on its path would match the shell running pkill too
+        execute_cmd('nohup sh %s/node_metrics.sh %s %s/node_metrics.csv > /dev/null 2>&1 & echo $! > %s/node_metrics.pid' %
+                    (NODE_METRICS_DIR, interval, NODE_METRICS_DIR, NODE_METRICS_DIR), hosts)
+
+        collector = {'started': time(),
+                     'hosts': hosts,
+                     'riak_pods': riak_pods,
+                     'interval': interval,
+                     'riak_status': {pod_name: list() for pod_name in riak_pods},
+                     'stop': Event(),
+                     'executor': ThreadPoolExecutor(max_workers=max(1, min(16, len(riak_pods))))}
+        collector['thread'] = Thread(target=self._sample_riak_status, args=(collector, kube_namespace))
+        collector['thread'].daemon = True
+        collector['thread'].start()
+        return collector
+
+    def _stop_metrics_collection(self, collector):
+        # stop the sampling and write the samples to a local directory, which is moved to the
+        # combination directory by save_results. The elapsed column is the number of seconds
+        # since the start of the FMKe clients, as the elapsed column of the latency files
+        logger.info('Stopping collecting the metrics')
+        stress_start = collector.get('stress_start', collector['started'])
+        collector['stop'].set()
+        collector['thread'].join()
+        collector['executor'].shutdown(wait=True)
+        try:
+            execute_cmd('kill $(cat %s/node_metrics.pid) 2> /dev/null || true' % NODE_METRICS_DIR, collector['hosts'])
+        except ExecuteCommandException as e:
+            logger.warning('Cannot stop node_metrics.sh on all the nodes: %s' % e)
+
+        metrics_dir = tempfile.mkdtemp(prefix='fmke_metrics_')
+        for host in collector['hosts']:
+            host_dir = tempfile.mkdtemp(dir=metrics_dir)
+            try:
+                getput_file(hosts=[host], file_paths=['%s/node_metrics.csv' % NODE_METRICS_DIR],
+                            dest_location=host_dir, action='get')
+                with open(os.path.join(host_dir, 'node_metrics.csv')) as f:
+                    samples = list(csv.DictReader(f))
+            except (ExecuteCommandException, IOError, OSError) as e:
+                logger.warning('Cannot get the metrics of %s: %s' % (host, e))
+                continue
+            finally:
+                shutil.rmtree(host_dir, ignore_errors=True)
+            self._write_node_metrics(samples, stress_start,
+                                     os.path.join(metrics_dir, '%s_node_metrics.csv' % host.split('.')[0]))
+
+        for pod_name, samples in collector['riak_status'].items():
+            with open(os.path.join(metrics_dir, '%s_riak_status.csv' % pod_name), 'w') as f:
+                writer = csv.DictWriter(f, fieldnames=['elapsed'] + RIAK_STATUS_KEYS, extrasaction='ignore')
+                writer.writeheader()
+                for status in sorted(samples, key=lambda status: status['timestamp']):
+                    status['elapsed'] = round(status['timestamp'] - stress_start, 1)
+                    writer.writerow(status)
+        return metrics_dir
+
+    def _write_node_metrics(self, samples, stress_start, file_path):
+        # convert the cumulative counters of node_metrics.sh to usage and rates between two samples
+        fieldnames = ['elapsed', 'cpu_util', 'cpu_iowait', 'mem_used_mb',
+                      'disk_read_mbps', 'disk_write_mbps', 'net_rx_mbps', 'net_tx_mbps']
+        with open(file_path, 'w') as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            writer.writeheader()
+            previous = None
+            for sample in samples:
+                try:
+                    sample = {key: float(value) for key, value in sample.items()}
+                except (TypeError, ValueError):
+                    # the last line can be incomplete when the sampling is stopped
+                    continue
+                if previous is not None:
+                    duration = sample['timestamp'] - previous['timestamp']
+                    cpu_total = sample['cpu_total'] - previous['cpu_total']
+                    if duration > 0 and cpu_total > 0:
+                        def rate(key, unit):
+                            return round((sample[key] - previous[key]) * unit / 1e6 / duration, 3)
+                        writer.writerow({
+                            'elapsed': round(sample['timestamp'] - stress_start, 1),
+                            'cpu_util': round(100.0 * (sample['cpu_busy'] - previous['cpu_busy']) / cpu_total, 2),
+                            'cpu_iowait': round(100.0 * (sample['cpu_iowait'] - previous['cpu_iowait']) / cpu_total, 2),
+                            'mem_used_mb': round(sample['mem_used_kb'] / 1024, 1),
+                            'disk_read_mbps': rate('disk_read_sectors', 512),
+                            'disk_write_mbps': rate('disk_write_sectors', 512),
+                            'net_rx_mbps': rate('net_rx_bytes', 1),
+                            'net_tx_mbps': rate('net_tx_bytes', 1)})
+                previous = sample
+
+    def _get_fmke_client_start(self, kube_namespace):
+        # the earliest start of the FMKe client containers, where the elapsed time of the latencies starts
+        configurator = k8s_session
+        fmke_clients = configurator.get_k8s_resources(resource='pod',
+                                                      label_selectors='app=fmke-client',
+                                                      kube_namespace=kube_namespace)
+        starts = list()
+        for pod in fmke_clients.items:
+            for status in pod.status.container_statuses or list():
+                if status.state.running and status.state.running.started_at:
+                    starts.append(status.state.running.started_at.timestamp())
+        if not starts:
+            return time()
+        return min(starts)
+
+    @timed
     def deploy_fmke_app(self, kube_namespace, comb):
         logger.info('------------------------------------')
         logger.info('3. Starting deploying FMKe benchmark')
@@ -161,13 +1217,16 @@ class FMKe_riakkv_g5k(performing_actions_g5k):
         file_path = os.path.join(fmke_k8s_dir, 'statefulSet_fmke.yaml.template')
         with open(file_path) as f:
             doc = yaml.safe_load(f)
-        
-        for i in range(1,11):
-            if 2 ** i > comb['concurrent_clients']:
-                connection_pool_size = 2 ** i
-                break
-        logger.debug("Init configurator: k8s_resources_configurator")
-        configurator = k8s_resources_configurator()
+
+        # the smallest power of 2 above the number of concurrent clients, in load search mode the
+        # app serves all the probes, up to max_concurrent_clients
+        load_search = self.configs['exp_env'].get('load_search') or dict()
+        if load_search.get('enable', False):
+            concurrent_clients = load_search.get('max_concurrent_clients', 1024)
+        else:
+            concurrent_clients = comb['concurrent_clients']
+        connection_pool_size = 2 ** max(1, int(concurrent_clients).bit_length())
+        configurator = k8s_session
         service_list = configurator.get_k8s_resources(resource='service',
                                                       label_selectors='app=riakkv,type=exposer-service',
                                                       kube_namespace=kube_namespace)
@@ -182,7 +1241,7 @@ class FMKe_riakkv_g5k(performing_actions_g5k):
                 {'name': 'DATABASE_ADDRESSES', 'value': ip},
                 {'name': 'TARGET_DATABASE', 'value': 'riak'},
                 {'name': 'CONNECTION_POOL_SIZE', 'value': '%s' % connection_pool_size}]
-            doc['spec']['template']['spec']['nodeSelector'] = {'service_g5k': 'fmke', 'cluster_g5k': '%s' % cluster}
+            doc['spec']['template']['spec']['nodeSelector'] = dict(self._node_labels('fmke'), cluster_g5k=cluster)
             file_path = os.path.join(fmke_k8s_dir, 'statefulSet_fmke_%s.yaml' % cluster)
             with open(file_path, 'w') as f:
                 yaml.safe_dump(doc, f)
@@ -191,17 +1250,15 @@ class FMKe_riakkv_g5k(performing_actions_g5k):
         configurator.deploy_k8s_resources(path=fmke_k8s_dir, namespace=kube_namespace)
 
         logger.info('Waiting until all fmke app servers are up')
-        deploy_ok = configurator.wait_k8s_resources(resource='pod',
-                                                    label_selectors="app=fmke",
-                                                    timeout=600,
-                                                    kube_namespace=kube_namespace)
+        fmke_app_list = wait_k8s_ready(resource='pod',
+                                       label_selectors="app=fmke",
+                                       timeout=600,
+                                       kube_namespace=kube_namespace,
+                                       n_expected=comb['n_fmke_client_per_dc'] * len(self.configs['exp_env']['clusters']))
 
-        if not deploy_ok:
+        if fmke_app_list is None:
             raise CancelCombException("Cannot wait until all fmke app servers are up")
         logger.info("Checking if FMKe_app deployed correctly")
-        fmke_app_list = configurator.get_k8s_resources_name(resource='pod',
-                                                            label_selectors='app=fmke',
-                                                            kube_namespace=kube_namespace)
         if len(fmke_app_list) != comb['n_fmke_client_per_dc'] * len(self.configs['exp_env']['clusters']):
             logger.info("n_fmke_app = %s, n_deployed_fmke_app = %s" %
                         (comb['n_fmke_client_per_dc']*len(self.configs['exp_env']['clusters']), len(fmke_app_list)))
@@ -209,13 +1266,84 @@ class FMKe_riakkv_g5k(performing_actions_g5k):
 
         logger.info('Finish deploying FMKe benchmark')
 
-    def deploy_fmke_pop(self, kube_namespace, comb):
+    def _is_replication_done(self, riakkv_sites, kube_namespace):
+        # no pending handoff inside each DC and empty realtime replication queues between DCs
+        configurator = k8s_session
+        for cluster, cluster_info in riakkv_sites.items():
+            pod_name = cluster_info['pod_names'][0]
+            result = configurator.execute_command(pod_name=pod_name,
+                                                  command='riak-admin transfers',
+                                                  kube_namespace=kube_namespace)
+            if 'No transfers active' not in result or 'waiting to handoff' in result:
+                logger.debug('Transfers are still active on %s site' % cluster)
+                return False
+            if len(riakkv_sites) > 1:
+                result = configurator.execute_command(pod_name=pod_name,
+                                                      command='riak-repl status',
+                                                      kube_namespace=kube_namespace)
+                pending = [int(n) for n in re.findall(r'{(?:pending|unacked),(\d+)}', result)]
+                if not pending or sum(pending) > 0:
+                    logger.debug('Realtime replication queue is not empty on %s site' % cluster)
+                    return False
+        return True
+
+    @timed
+    def _wait_replication_done(self, riakkv_sites, kube_namespace, timeout=600):
+        logger.info('Waiting for the replication and key distribution mechanisms between DCs')
+        if not wait_until(lambda: self._is_replication_done(riakkv_sites, kube_namespace),
+                          'all handoffs and realtime replication queues are finished', timeout=timeout):
+            logger.warning('Replication and key distribution are not finished after %s seconds' % timeout)
+
+    def _run_fmke_populator(self, kube_namespace, job_name, args, fmke_IPs, timeout=300):
+        # run one FMKe populator job and return the number of populated entities and the time (seconds)
+        fmke_k8s_dir = self.configs['exp_env']['fmke_yaml_path']
+        with open(os.path.join(fmke_k8s_dir, 'populate_data.yaml.template')) as f:
+            doc = yaml.safe_load(f)
+        doc['metadata']['name'] = job_name
+        doc['spec']['template']['spec']['containers'][0]['args'] = [args] + fmke_IPs
+        doc['spec']['template']['spec']['nodeSelector'] = self._node_labels('fmke')
+        with open(os.path.join(fmke_k8s_dir, 'populate_data.yaml'), 'w') as f:
+            yaml.safe_dump(doc, f)
+
+        with self.timer.span(job_name):
+            configurator = k8s_session
+            configurator.deploy_k8s_resources(files=[os.path.join(fmke_k8s_dir, 'populate_data.yaml')],
+                                              namespace=kube_namespace)
+            deploy_ok = wait_k8s_ready(resource='job',
+                                       label_selectors="app=fmke_pop",
+                                       timeout=timeout,
+                                       kube_namespace=kube_namespace) is not None
+            if not deploy_ok:
+                raise CancelCombException("Cannot wait until finishing the populator job %s" % job_name)
+
+        logger.info('Checking if the populating process %s finished successfully or not' % job_name)
+        fmke_pop_pods = configurator.get_k8s_resources_name(resource='pod',
+                                                            label_selectors='job-name=%s' % job_name,
+                                                            kube_namespace=kube_namespace)
+        if len(fmke_pop_pods) == 0:
+            raise CancelCombException("Cannot find the pod of the populator job %s" % job_name)
+        logger.debug('FMKe pod name: %s' % fmke_pop_pods[0])
+        log = configurator.get_k8s_pod_log(pod_name=fmke_pop_pods[0], kube_namespace=kube_namespace)
+        last_line = log.strip().split('\n')[-1]
+        logger.info('Last line of log: %s' % last_line)
+        if 'Populated' not in last_line:
+            raise CancelCombException("Populating process %s ERROR" % job_name)
+        # Populated <n> entities in <time> sec (avg ...), the time may be preceded by a space
+        result = last_line.split(' ')
+        if 'entities in' in last_line and 'avg' in last_line:
+            if len(result) == 8:
+                return result[4], result[6]
+            if len(result) == 9:
+                return result[4], result[7]
+        logger.warning('Cannot read the populating time of %s' % job_name)
+        return 'NA', 'NA'
+
+    @timed
+    def deploy_fmke_pop(self, kube_namespace, comb, riakkv_sites):
         logger.info('---------------------------')
         logger.info('4. Starting deploying FMKe populator')
-        fmke_k8s_dir = self.configs['exp_env']['fmke_yaml_path']
 
-        logger.debug('Modify the populate_data template file')
-        configurator = k8s_resources_configurator()
+        configurator = k8s_session
         fmke_list = configurator.get_k8s_resources(resource='pod',
                                                    label_selectors='app=fmke',
                                                    kube_namespace=kube_namespace)
@@ -224,87 +1352,32 @@ class FMKe_riakkv_g5k(performing_actions_g5k):
             for fmke in fmke_list.items:
                 if cluster in fmke.metadata.name:
                     fmke_IPs.append('fmke@%s' % fmke.status.pod_ip)
-        with open(os.path.join(fmke_k8s_dir, 'populate_data.yaml.template')) as f:
-            doc = yaml.safe_load(f)
-        doc['metadata']['name'] = 'populate-data-without-prescriptions'
-        doc['spec']['template']['spec']['containers'][0]['args'] = ['-f -d %s --noprescriptions -p %s' %
-                                                                    (comb['dataset'], comb['n_fmke_pop_process'])] + fmke_IPs
-        with open(os.path.join(fmke_k8s_dir, 'populate_data.yaml'), 'w') as f:
-            yaml.safe_dump(doc, f)
 
         logger.info("Populating the FMKe benchmark data without prescriptions")
-        logger.debug("Init configurator: k8s_resources_configurator")
-        configurator = k8s_resources_configurator()
-        configurator.deploy_k8s_resources(files=[os.path.join(fmke_k8s_dir, 'populate_data.yaml')],
-                                          namespace=kube_namespace)
-
-        logger.info('Waiting for populating data without prescriptions')
-        deploy_ok = configurator.wait_k8s_resources(resource='job',
-                                                    label_selectors="app=fmke_pop",
-                                                    timeout=300,
-                                                    kube_namespace=kube_namespace)
-        if not deploy_ok:
-            raise CancelCombException("Cannot wait until finishing populating data")
-
-        logger.info('Checking if the populating process finished successfully or not')
-        fmke_pop_pods = configurator.get_k8s_resources_name(resource='pod',
-                                                            label_selectors='job-name=populate-data-without-prescriptions',
-                                                            kube_namespace=kube_namespace)
-        logger.debug('FMKe pod name: %s' % fmke_pop_pods[0])
-        pop_result = dict()
-        if len(fmke_pop_pods) > 0:
-            log = configurator.get_k8s_pod_log(
-                pod_name=fmke_pop_pods[0], kube_namespace=kube_namespace)
-            last_line = log.strip().split('\n')[-1]
-            logger.info('Last line of log: %s' % last_line)
-            if 'Populated' in last_line and 'entities in' in last_line and 'avg' in last_line:
-                result = log.strip().split('\n')[-1].split(' ')
-                if len(result) == 8:
-                    pop_result = result[4] + "\n" + result[6]
-                if len(result) == 9:
-                    pop_result = result[4] + "\n" + result[7]
-                t = 10
-                logger.info('Waiting %s minutes for the replication and key distribution mechanisms between DCs' % t)
-                sleep(t*60)
-            else:
-                raise CancelCombException("Populating process ERROR")
-            logger.debug("FMKe populator result: \n%s" % pop_result)
-
-
-        logger.debug('Modify the populate_data file to populate prescriptions')
-        with open(os.path.join(fmke_k8s_dir, 'populate_data.yaml.template')) as f:
-            doc = yaml.safe_load(f)
-        doc['metadata']['name'] = 'populate-data-with-onlyprescriptions'
-        doc['spec']['template']['spec']['containers'][0]['args'] = [
-            '-f --onlyprescriptions -p 1'] + fmke_IPs
-        with open(os.path.join(fmke_k8s_dir, 'populate_data.yaml'), 'w') as f:
-            yaml.safe_dump(doc, f)
-        
-
-        logger.info("Populating the FMKe benchmark data with prescriptions")
-        configurator.deploy_k8s_resources(files=[os.path.join(fmke_k8s_dir, 'populate_data.yaml')],
-                                          namespace=kube_namespace)
-
-        logger.info('Waiting for populating data without only prescriptions')
-        configurator.wait_k8s_resources(resource='job',
-                                        label_selectors="app=fmke_pop",
-                                        timeout=300,
-                                        kube_namespace=kube_namespace)
-        logger.info('Checking if the populating process finished successfully or not')
-        fmke_pop_pods = configurator.get_k8s_resources_name(resource='pod',
-                                                            label_selectors='job-name=populate-data-with-onlyprescriptions',
-                                                            kube_namespace=kube_namespace)
-        logger.debug('FMKe pod: %s' % fmke_pop_pods[0])
-        if len(fmke_pop_pods) > 0:
-            log = configurator.get_k8s_pod_log(
-                pod_name=fmke_pop_pods[0], kube_namespace=kube_namespace)
-            last_line = log.strip().split('\n')[-1]
-            logger.info('Last line of log: %s' % last_line)
-            if 'Populated' not in last_line:
-                raise CancelCombException("Populating process ERROR")
-            t = 10
-            logger.info('Waiting %s minutes for the replication and key distribution mechanisms between DCs' % t)
-            sleep(t*60)
+        n_entities, pop_time = self._run_fmke_populator(kube_namespace=kube_namespace,
+                                                        job_name='populate-data-without-prescriptions',
+                                                        args='-f -d %s --noprescriptions -p %s' %
+                                                             (comb['dataset'], comb['n_fmke_pop_process']),
+                                                        fmke_IPs=fmke_IPs)
+        # the first two lines are the number of entities and the time of populating without prescriptions
+        pop_result = n_entities + "\n" + pop_time
+        self._wait_replication_done(riakkv_sites, kube_namespace)
+        logger.debug("FMKe populator result: \n%s" % pop_result)
+
+        # the populator splits the prescriptions between its processes,
+        # which send their requests to the FMKe app pods of all DCs in turn
+        n_process = self.configs['exp_env'].get('n_fmke_pop_prescription_process', 1)
+        if n_process == 'auto':
+            n_process = len(fmke_IPs)
+        logger.info("Populating the FMKe benchmark data with prescriptions by %s processes" % n_process)
+        n_entities, pop_time = self._run_fmke_populator(kube_namespace=kube_namespace,
+                                                        job_name='populate-data-with-onlyprescriptions',
+                                                        args='-f --onlyprescriptions -p %s' % n_process,
+                                                        fmke_IPs=fmke_IPs,
+                                                        timeout=self.configs['exp_env'].get(
+                                                            'prescription_pop_timeout', 300))
+        pop_result += "\n" + n_entities + "\n" + pop_time
+        self._wait_replication_done(riakkv_sites, kube_namespace)
         logger.info('Finish populating data')
 
         return pop_result
@@ -325,6 +1398,67 @@ class FMKe_riakkv_g5k(performing_actions_g5k):
             return 1024
         return 2048
 
+    def _execute_pod_commands(self, pod_name, commands, kube_namespace):
+        # run the commands one after another in the pod, the threads share the configurator of
+        # k8s_session: cloudal's execute_command opens its own API client and exec stream for each call
+        configurator = k8s_session
+        results = list()
+        for command in commands:
+            results.append(configurator.execute_command(pod_name=pod_name,
+                                                        command=command,
+                                                        kube_namespace=kube_namespace))
+        return results
+
+    def _create_riakkv_ring(self, cluster, cluster_info, ring_size, kube_namespace, parent_span):
+        # runs concurrently for every site, so its spans are named after parent_span explicitly
+        parent_span = '%s/%s' % (parent_span, cluster)
+        logger.info("On %s site:" % cluster)
+        logger.debug("cluster_info: %s" % cluster_info)
+        logger.info("  -->Joining all RiakKV instances on %s site" % cluster)
+        commands = ["riak-admin cluster join riak@%s" % cluster_info['pod_ips'][0]]
+        # reset ring_size
+        if ring_size != 64:
+            commands.append('''sed -i -e "s/## ring_size = 64/ring_size = %s/g" /etc/riak/riak.conf''' % ring_size)
+        with self.timer.span('join', parent=parent_span):
+            run_concurrently({'join %s' % pod_name: partial(self._execute_pod_commands, pod_name, commands,
+                                                            kube_namespace)
+                              for pod_name in cluster_info['pod_names']})
+
+        logger.info("  --> Check and commit RiakKV cluster plan on %s site" % cluster)
+        with self.timer.span('commit', parent=parent_span):
+            self._execute_pod_commands(cluster_info['pod_names'][0],
+                                       ["riak-admin cluster plan", "riak-admin cluster commit"],
+                                       kube_namespace)
+        with self.timer.span('ring_ready', parent=parent_span):
+            if not wait_until(lambda: self._is_ring_ready(cluster_info['pod_names'][0], kube_namespace),
+                              'RiakKV ring on %s site is ready' % cluster, timeout=300):
+                raise CancelCombException("Cannot create RiakKV ring on %s site" % cluster)
+        logger.debug("Create RiakKV ring on %s site successfully!" % cluster)
+        logger.info("  --> Set cluster name on %s site" % cluster)
+        self._execute_pod_commands(cluster_info['pod_names'][0],
+                                   ["riak-repl clustername %s" % cluster],
+                                   kube_namespace)
+
+    def _is_ring_ready(self, pod_name, kube_namespace):
+        configurator = k8s_session
+        result = configurator.execute_command(pod_name=pod_name,
+                                              command="riak-admin cluster status",
+                                              kube_namespace=kube_namespace)
+        return "Ring ready: true" in result
+
+    def _is_riak_node_ready(self, pod_name, kube_namespace):
+        configurator = k8s_session
+        result = configurator.execute_command(pod_name=pod_name,
+                                              command="riak ping",
+                                              kube_namespace=kube_namespace)
+        if 'pong' not in result:
+            return False
+        result = configurator.execute_command(pod_name=pod_name,
+                                              command="riak-admin ring-status",
+                                              kube_namespace=kube_namespace)
+        return 'Ring Ready: true' in result and 'No pending changes' in result
+
+    @timed
     def deploy_riakkv(self, kube_namespace, comb):
         logger.info('--------------------------------------')
         logger.info('2. Starting deploying riakkv cluster')
@@ -347,25 +1481,25 @@ class FMKe_riakkv_g5k(performing_actions_g5k):
         for cluster in self.configs['exp_env']['clusters']:
             doc['spec']['replicas'] = comb['n_riakkv_per_dc']
             doc['metadata']['name'] = 'riakkv-%s' % cluster
-            doc['spec']['template']['spec']['nodeSelector'] = {
-                'service_g5k': 'riakkv', 'cluster_g5k': '%s' % cluster}
+            doc['spec']['template']['spec']['nodeSelector'] = dict(self._node_labels('riakkv'), cluster_g5k=cluster)
             file_path = os.path.join(riakkv_k8s_dir, 'statefulSet_%s.yaml' % cluster)
             with open(file_path, 'w') as f:
                 yaml.safe_dump(doc, f)
             deploy_files.append(file_path)
 
-        logger.info("Starting RiakKV instances")
-        logger.debug("Init configurator: k8s_resources_configurator")
-        configurator = k8s_resources_configurator()
-        configurator.deploy_k8s_resources(files=deploy_files, namespace=kube_namespace)
+        with self.timer.span('start_pods'):
+            logger.info("Starting RiakKV instances")
+            configurator = k8s_session
+            configurator.deploy_k8s_resources(files=deploy_files, namespace=kube_namespace)
 
-        logger.info('Waiting until all riakkv instances are up')
-        deploy_ok = configurator.wait_k8s_resources(resource='pod',
-                                                    label_selectors="app=riakkv",
-                                                    timeout=600,
-                                                    kube_namespace=kube_namespace)
-        if not deploy_ok:
-            raise CancelCombException("Cannot deploy enough RiakKV instances")
+            logger.info('Waiting until all riakkv instances are up')
+            riakkv_pods = wait_k8s_ready(resource='pod',
+                                         label_selectors="app=riakkv",
+                                         timeout=600,
+                                         kube_namespace=kube_namespace,
+                                         n_expected=comb['n_riakkv_per_dc'] * len(self.configs['exp_env']['clusters']))
+            if riakkv_pods is None:
+                raise CancelCombException("Cannot deploy enough RiakKV instances")
 
         riakkv_sites = dict()
         for cluster in self.configs["exp_env"]["clusters"]:
@@ -374,13 +1508,9 @@ class FMKe_riakkv_g5k(performing_actions_g5k):
             riakkv_sites[cluster]['pod_names'] = list()
             riakkv_sites[cluster]['pod_ips'] = list()
 
-        riakkv_pods = configurator.get_k8s_resources(resource="pod",
-                                                     label_selectors="app=riakkv",
-                                                     kube_namespace=kube_namespace)
-
         riak_master_ip = None
         riak_pod_names = list()
-        for pod in riakkv_pods.items:
+        for pod in riakkv_pods:
             cluster = pod.spec.node_name.split("-")[0].strip()
             if pod.spec.node_name not in riakkv_sites[cluster]['host_names']:
                 riakkv_sites[cluster]['host_names'].append(pod.spec.node_name)
@@ -412,90 +1542,48 @@ class FMKe_riakkv_g5k(performing_actions_g5k):
 
         logger.info("Creating RiakKV ring(s)")
         for cluster, cluster_info in riakkv_sites.items():
-            logger.info("On %s site:" % cluster)
-            logger.debug("cluster_info: %s" % cluster_info)
-            if len(cluster_info['pod_names']) > 0:
-                logger.info("  -->Joining all RiakKV instances")
-                for pod_name in cluster_info['pod_names']:
-                    configurator.execute_command(pod_name=pod_name,
-                                                command="riak-admin cluster join riak@%s" % cluster_info['pod_ips'][0],
-                                                kube_namespace=kube_namespace)
-                    # reset ring_size
-                    if ring_size != 64:
-                        r = configurator.execute_command(pod_name=pod_name,
-                                                    command='''sed -i -e "s/## ring_size = 64/ring_size = %s/g" /etc/riak/riak.conf''' % ring_size,
-                                                    kube_namespace=kube_namespace)
-                logger.info("  --> Check RiakKV cluster plan")
-                configurator.execute_command(pod_name=cluster_info['pod_names'][0],
-                                            command="riak-admin cluster plan",
-                                            kube_namespace=kube_namespace)
-                logger.info("  --> Commiting RiakKV cluster plan")
-                configurator.execute_command(pod_name=cluster_info['pod_names'][0],
-                                            command="riak-admin cluster commit",
-                                            kube_namespace=kube_namespace)
-                count = 10
-                while True:
-                    count -= 1
-                    sleep(30)
-                    result = configurator.execute_command(pod_name=cluster_info['pod_names'][0],
-                                                        command="riak-admin cluster status",
-                                                        kube_namespace=kube_namespace)
-                    if "Ring ready: true" in result:
-                        logger.debug("Create RiakKV ring on %s site successfully!" % cluster)
-                        logger.info("  --> Set cluster name on %s site" % cluster)
-                        configurator.execute_command(pod_name=cluster_info['pod_names'][0],
-                                                    command="riak-repl clustername %s" % cluster,
-                                                    kube_namespace=kube_namespace) 
-                        
-                        break
-                    if count <= 0:
-                        raise CancelCombException("Cannot create RiakKV ring on %s site" % cluster)
-                
-                   
-            else:    
+            if len(cluster_info['pod_names']) == 0:
                 raise CancelCombException("There is no RiakKV pod on %s site" % cluster)
+        with self.timer.span('create_rings'):
+            run_concurrently({'create ring on %s site' % cluster: partial(self._create_riakkv_ring, cluster,
+                                                                          cluster_info, ring_size, kube_namespace,
+                                                                          self.timer.current())
+                              for cluster, cluster_info in riakkv_sites.items()})
 
         if len(self.configs['exp_env']['clusters']) > 1:
-            logger.info('Creating RiakKV cluster')
-            for cluster, cluster_info in riakkv_sites.items():
-                configurator.execute_command(pod_name=cluster_info['pod_names'][0],
-                                            command="sed -i -e s/127.0.0.1/%s/g /etc/riak/advanced.config" % cluster_info['pod_ips'][0],
-                                            kube_namespace=kube_namespace) 
-                configurator.execute_command(pod_name=cluster_info['pod_names'][0],
-                                            command="riak restart",
-                                            kube_namespace=kube_namespace)
-            sleep(200)
-            for cluster, cluster_info in riakkv_sites.items():
-                cluster_list = [each for each,_ in riakkv_sites.items() if each != cluster]
-                for other_cluster in cluster_list:
-                    configurator.execute_command(pod_name=cluster_info['pod_names'][0],
-                                                command="riak-repl connect %s:9080" % riakkv_sites[other_cluster]['pod_ips'][0],
-                                                kube_namespace=kube_namespace)
-                    configurator.execute_command(pod_name=cluster_info['pod_names'][0],
-                                                command="riak-repl realtime enable %s" % other_cluster,
-                                                kube_namespace=kube_namespace) 
-                    configurator.execute_command(pod_name=cluster_info['pod_names'][0],
-                                                command="riak-repl realtime start %s" % other_cluster,
-                                                kube_namespace=kube_namespace)
-        logger.info('Adding bucket-type for RiakKV to be used by FMKe benchmark')
-        for cluster,_ in riakkv_sites.items():
-            r = configurator.execute_command(pod_name=riakkv_sites[cluster]['pod_names'][0],
-                                            command="""riak-admin bucket-type create sets {"props":{"datatype":"set"}}""",
-                                            kube_namespace=kube_namespace)
-            logger.debug('result = %s' % r)
-            r = configurator.execute_command(pod_name=riakkv_sites[cluster]['pod_names'][0],
-                                            command="riak-admin bucket-type activate sets",
-                                            kube_namespace=kube_namespace)
-            logger.debug('result = %s' % r)
-            r = configurator.execute_command(pod_name=riakkv_sites[cluster]['pod_names'][0],
-                                            command="""riak-admin bucket-type create maps {"props":{"datatype":"map"}}""",
-                                            kube_namespace=kube_namespace)
-            logger.debug('result = %s' % r)
-            r = configurator.execute_command(pod_name=riakkv_sites[cluster]['pod_names'][0],
-                                            command="riak-admin bucket-type activate maps",
-                                            kube_namespace=kube_namespace)
-            logger.debug('result = %s' % r)
-
+            with self.timer.span('connect_dcs'):
+                logger.info('Creating RiakKV cluster')
+                run_concurrently({'restart %s' % cluster_info['pod_names'][0]: partial(
+                    self._execute_pod_commands, cluster_info['pod_names'][0],
+                    ["sed -i -e s/127.0.0.1/%s/g /etc/riak/advanced.config" % cluster_info['pod_ips'][0],
+                     "riak restart"],
+                    kube_namespace) for cluster_info in riakkv_sites.values()})
+                for cluster, cluster_info in riakkv_sites.items():
+                    if not wait_until(lambda: self._is_riak_node_ready(cluster_info['pod_names'][0], kube_namespace),
+                                      'RiakKV node %s is up again' % cluster_info['pod_names'][0], timeout=300):
+                        raise CancelCombException("RiakKV node on %s site is not up after restarting" % cluster)
+                tasks = dict()
+                for cluster, cluster_info in riakkv_sites.items():
+                    commands = list()
+                    for other_cluster in [each for each in riakkv_sites if each != cluster]:
+                        commands += ["riak-repl connect %s:9080" % riakkv_sites[other_cluster]['pod_ips'][0],
+                                     "riak-repl realtime enable %s" % other_cluster,
+                                     "riak-repl realtime start %s" % other_cluster]
+                    tasks['connect %s site' % cluster] = partial(self._execute_pod_commands,
+                                                                 cluster_info['pod_names'][0], commands, kube_namespace)
+                run_concurrently(tasks)
+
+        with self.timer.span('bucket_types'):
+            logger.info('Adding bucket-type for RiakKV to be used by FMKe benchmark')
+            commands = ["""riak-admin bucket-type create sets {"props":{"datatype":"set"}}""",
+                        "riak-admin bucket-type activate sets",
+                        """riak-admin bucket-type create maps {"props":{"datatype":"map"}}""",
+                        "riak-admin bucket-type activate maps"]
+            results = run_concurrently({cluster: partial(self._execute_pod_commands, cluster_info['pod_names'][0],
+                                                         commands, kube_namespace)
+                                        for cluster, cluster_info in riakkv_sites.items()})
+            for cluster, r in results.items():
+                logger.debug('result on %s site = %s' % (cluster, r))
 
         logger.debug('Creating exposer-service.yaml files')
         deploy_files = list()
@@ -510,14 +1598,17 @@ class FMKe_riakkv_g5k(performing_actions_g5k):
                 yaml.safe_dump(doc, f)
             deploy_files.append(file_path)
         
-        logger.info("Deploying RiakKV exposing services")
-        configurator.deploy_k8s_resources(files=deploy_files, namespace=kube_namespace)
-        logger.info('Waiting until all exposing services are created')
-        deploy_ok = configurator.wait_k8s_resources(resource='pod',
-                                                    label_selectors='app=riakkv,type=exposer-service',
-                                                    kube_namespace=kube_namespace)
-        if not deploy_ok:
-            raise CancelCombException("Cannot connect RiakKV instances to create DC")
+        with self.timer.span('exposer_services'):
+            logger.info("Deploying RiakKV exposing services")
+            configurator.deploy_k8s_resources(files=deploy_files, namespace=kube_namespace)
+            logger.info('Waiting until all exposing services are created')
+            # the exposers are services, they have no pod of their own
+            deploy_ok = wait_until(lambda: len(configurator.get_k8s_resources_name(
+                                       resource='service', label_selectors='app=riakkv,type=exposer-service',
+                                       kube_namespace=kube_namespace, cached=False)) >= len(riakkv_sites),
+                                   'all exposing services are created', timeout=300, interval=1)
+            if not deploy_ok:
+                raise CancelCombException("Cannot connect RiakKV instances to create DC")
 
 
 
@@ -525,43 +1616,286 @@ class FMKe_riakkv_g5k(performing_actions_g5k):
         logger.info('Finish deploying the riakkv cluster')
         return riakkv_sites
 
+    def _get_owned_partitions(self, pod_name, pod_ip, kube_namespace):
+        configurator = k8s_session
+        result = configurator.execute_command(pod_name=pod_name,
+                                              command="riak-admin cluster partitions --node=riak@%s" % pod_ip,
+                                              kube_namespace=kube_namespace)
+        # each line of the table looks like: | primary | 91343852333181432387730302044767688728495783936 | 4 |
+        return re.findall(r'\|\s*primary\s*\|\s*(\d+)\s*\|', result)
+
+    def _snapshot_pod(self, pod_name, pod_ip, snapshot_dir, kube_namespace):
+        partitions = self._get_owned_partitions(pod_name, pod_ip, kube_namespace)
+        logger.debug('Archiving %s partitions of %s' % (len(partitions), pod_name))
+        cmd = '''bash -c 'riak stop; mkdir -p %s; cd %s;
+                 for backend in %s; do
+                     for p in %s; do
+                         if [ -d $backend/$p ]; then tar czf %s/$backend-$p.tar.gz -C $backend $p; fi
+                     done
+                 done; riak start' ''' % (snapshot_dir, RIAK_DATA_DIR, ' '.join(RIAK_BACKENDS),
+                                          ' '.join(partitions), snapshot_dir)
+        self._execute_pod_commands(pod_name, [cmd], kube_namespace)
+        if not wait_until(lambda: self._is_riak_node_ready(pod_name, kube_namespace),
+                          'RiakKV node %s is up again' % pod_name, timeout=300):
+            raise CancelCombException("RiakKV node %s is not up after taking the snapshot" % pod_name)
+
+    def _restore_pod(self, pod_name, pod_ip, snapshot_dir, kube_namespace):
+        partitions = self._get_owned_partitions(pod_name, pod_ip, kube_namespace)
+        logger.debug('Restoring %s partitions of %s' % (len(partitions), pod_name))
+        # the partitions owned by the node that have no archive in any backend are printed after
+        # "missing partitions:", the node would serve them empty
+        cmd = '''bash -c 'riak stop; cd %s; missing="";
+                 for p in %s; do
+                     found=0
+                     for backend in %s; do
+                         f=%s/$backend-$p.tar.gz
+                         if [ -f $f ]; then mkdir -p $backend && rm -rf $backend/$p && tar xzf $f -C $backend && found=1; fi
+                     done
+                     if [ $found = 0 ]; then missing="$missing $p"; fi
+                 done; chown -R riak:riak %s; riak start; echo "missing partitions:$missing"' ''' % (
+            RIAK_DATA_DIR, ' '.join(partitions), ' '.join(RIAK_BACKENDS), snapshot_dir, RIAK_DATA_DIR)
+        result = self._execute_pod_commands(pod_name, [cmd], kube_namespace)[0]
+        missing = re.search(r'missing partitions:(.*)', result)
+        if missing is None:
+            raise CancelCombException("Cannot check the partitions restored on %s" % pod_name)
+        if missing.group(1).split():
+            raise CancelCombException("%s of the %s partitions owned by %s have no archive in the snapshot" %
+                                      (len(missing.group(1).split()), len(partitions), pod_name))
+        if not wait_until(lambda: self._is_riak_node_ready(pod_name, kube_namespace),
+                          'RiakKV node %s is up again' % pod_name, timeout=300):
+            raise CancelCombException("RiakKV node %s is not up after restoring the snapshot" % pod_name)
+
+    @timed
+    def take_riakkv_snapshot(self, kube_namespace, riakkv_sites, snapshot_id):
+        # Archive the partitions owned by every RiakKV node into the hostPath volume of its kube worker.
+        # A node of the next deployment can own other partitions, so all the archives of a site
+        # are then copied to every RiakKV worker of this site
+        logger.info('Taking a snapshot of the populated RiakKV data: %s' % snapshot_id)
+        snapshot_dir = os.path.join(RIAK_SNAPSHOT_POD_DIR, snapshot_id)
+        tasks = dict()
+        for cluster_info in riakkv_sites.values():
+            for pod_name, pod_ip in zip(cluster_info['pod_names'], cluster_info['pod_ips']):
+                tasks['snapshot %s' % pod_name] = partial(self._snapshot_pod, pod_name, pod_ip,
+                                                          snapshot_dir, kube_namespace)
+        run_concurrently(tasks)
+
+        configurator = k8s_session
+        host_snapshot_dir = os.path.join(RIAK_SNAPSHOT_HOST_DIR, snapshot_id)
+        for cluster, cluster_info in riakkv_sites.items():
+            local_dir = tempfile.mkdtemp(prefix='riakkv_snapshot_')
+            try:
+                for host in cluster_info['host_names']:
+                    getput_file(hosts=[host], file_paths=[host_snapshot_dir + '/*'],
+                                dest_location=local_dir, action='get')
+                if not os.listdir(local_dir):
+                    logger.warning('No RiakKV data is archived on %s site, the snapshot is not used' % cluster)
+                    return False
+                riakkv_workers = configurator.get_k8s_resources_name(
+                    resource='node', label_selectors=self._node_selector('riakkv', cluster_g5k=cluster))
+                execute_cmd('mkdir -p %s' % host_snapshot_dir, riakkv_workers)
+                getput_file(hosts=riakkv_workers,
+                            file_paths=[os.path.join(local_dir, f) for f in os.listdir(local_dir)],
+                            dest_location=host_snapshot_dir, action='put')
+            finally:
+                shutil.rmtree(local_dir, ignore_errors=True)
+        logger.info('Finish taking the snapshot')
+        return True
+
+    @timed
+    def restore_riakkv_snapshot(self, kube_namespace, riakkv_sites, snapshot_id):
+        logger.info('Restoring the RiakKV data from the snapshot: %s' % snapshot_id)
+        snapshot_dir = os.path.join(RIAK_SNAPSHOT_POD_DIR, snapshot_id)
+        tasks = dict()
+        for cluster_info in riakkv_sites.values():
+            for pod_name, pod_ip in zip(cluster_info['pod_names'], cluster_info['pod_ips']):
+                tasks['restore %s' % pod_name] = partial(self._restore_pod, pod_name, pod_ip,
+                                                         snapshot_dir, kube_namespace)
+        run_concurrently(tasks)
+        self._wait_replication_done(riakkv_sites, kube_namespace)
+        logger.info('Finish restoring the snapshot')
+
+    @timed
     def clean_k8s_resources(self, kube_namespace, n_fmke_client_per_dc):
         logger.info('1. Deleting all k8s resource from the previous run in namespace "%s"' %
                     kube_namespace)
         logger.info(
             'Delete namespace "%s" to delete all the resources, then create it again' % kube_namespace)
-        configurator = k8s_resources_configurator()
+        configurator = k8s_session
         configurator.delete_namespace(kube_namespace)
         configurator.create_namespace(kube_namespace)
 
         if n_fmke_client_per_dc > 0:
             logger.debug('Delete all files in /tmp/results folder on fmke_client nodes')
             results_nodes = configurator.get_k8s_resources_name(resource='node',
-                                                                label_selectors='service_g5k=fmke',
+                                                                label_selectors=self._node_selector('fmke'),
                                                                 kube_namespace=kube_namespace)
             cmd = 'rm -rf /tmp/results && mkdir -p /tmp/results'
             execute_cmd(cmd, results_nodes)
 
+    @timed
+    def clean_fmke_resources(self, kube_namespace, n_fmke_client_per_dc):
+        logger.info('1. Deleting the FMKe resources from the previous run in namespace "%s", '
+                    'the RiakKV cluster is kept' % kube_namespace)
+        k8s_session.batch_v1.delete_collection_namespaced_job(namespace=kube_namespace,
+                                                              label_selector='app in (fmke-client, fmke_pop)',
+                                                              propagation_policy='Background')
+        k8s_session.apps_v1.delete_collection_namespaced_stateful_set(namespace=kube_namespace,
+                                                                      label_selector='app=fmke',
+                                                                      propagation_policy='Background')
+        core_v1 = k8s_session.core_v1
+        for service in core_v1.list_namespaced_service(namespace=kube_namespace, label_selector='app=fmke').items:
+            core_v1.delete_namespaced_service(name=service.metadata.name, namespace=kube_namespace)
+        k8s_session.invalidate(kube_namespace)
+
+        configurator = k8s_session
+
+        def is_fmke_deleted():
+            fmke_pods = configurator.get_k8s_resources_name(resource='pod',
+                                                            label_selectors='app in (fmke, fmke-client, fmke_pop)',
+                                                            kube_namespace=kube_namespace,
+                                                            cached=False)
+            return len(fmke_pods) == 0
+
+        if not wait_until(is_fmke_deleted, 'all FMKe pods are deleted', timeout=300):
+            raise CancelCombException("Cannot delete the FMKe resources of the previous run")
+
+        if n_fmke_client_per_dc > 0:
+            logger.debug('Delete all files in /tmp/results folder on fmke_client nodes')
+            results_nodes = configurator.get_k8s_resources_name(resource='node',
+                                                                label_selectors=self._node_selector('fmke'),
+                                                                kube_namespace=kube_namespace)
+            cmd = 'rm -rf /tmp/results && mkdir -p /tmp/results'
+            execute_cmd(cmd, results_nodes)
+
+    def _get_riakkv_topology(self, comb):
+        # the combinations with the same topology can run on the same RiakKV cluster and data
+        return (comb['n_riakkv_per_dc'], comb['dataset'], comb['n_dc'], comb['n_fmke_pop_process'])
+
+    def _sort_combs(self, combs):
+        # Order the remaining combinations to avoid redeploying the RiakKV cluster: first the ones
+        # that can run on the deployed cluster, then group by topology and sweep the FMKe
+        # parameters inside each group. Used as the filter of sweeper.get_next()
+        deployed_topology = self.deployed_riakkv['topology'] if self.deployed_riakkv else None
+
+        def sort_key(comb):
+            topology = self._get_riakkv_topology(comb)
+            return (topology != deployed_topology,
+                    comb['n_dc'], comb['n_riakkv_per_dc'], comb['dataset'], comb['n_fmke_pop_process'],
+                    comb['n_fmke_client_per_dc'], comb.get('concurrent_clients', 0), comb.get('iteration', 0))
+        return sorted(combs, key=sort_key)
+
+    def _save_timings(self, comb, comb_dir, comb_ok, timer=None):
+        timings = (timer or self.timer).to_dict()
+        steps = ', '.join('%s: %.0fs' % (span['name'], span['duration'])
+                          for span in timings['spans'] if '/' not in span['name'])
+        logger.info('Timings of the combination (%.0fs): %s' % (timings['total'], steps))
+        if comb_dir:
+            timings['comb'] = comb
+            with open(os.path.join(comb_dir, 'timings.json'), 'w') as f:
+                json.dump(timings, f, indent=2)
+
+        # the summary of all the combinations run with this results directory,
+        # including the canceled ones, to find the steps worth optimizing
+        summary_path = os.path.join(self.configs['exp_env']['results_dir'], 'timings_summary.json')
+        with self._summary_lock:
+            self._update_timings_summary(summary_path, timings, comb_ok)
+
+    def _update_timings_summary(self, summary_path, timings, comb_ok):
+        summary = {'n_combs': 0, 'n_canceled': 0, 'total': 0.0, 'spans': dict()}
+        if os.path.exists(summary_path):
+            with open(summary_path) as f:
+                summary = json.load(f)
+        summary['n_combs'] += 1
+        if not comb_ok:
+            summary['n_canceled'] += 1
+        summary['total'] = round(summary['total'] + timings['total'], 3)
+        for span in timings['spans']:
+            stats = summary['spans'].setdefault(span['name'], {'count': 0, 'total': 0.0, 'max': 0.0})
+            stats['count'] += 1
+            stats['total'] = round(stats['total'] + span['duration'], 3)
+            stats['max'] = max(stats['max'], span['duration'])
+            stats['mean'] = round(stats['total'] / stats['count'], 3)
+        with open(summary_path, 'w') as f:
+            json.dump(summary, f, indent=2, sort_keys=True)
+
     def run_exp_workflow(self, kube_namespace, comb, kube_master, sweeper):
         comb_ok = False
+        comb_dir = None
+        # the results are collected by the result pipeline, which reports the combination to the sweeper
+        handed_off = False
+        self.timer = PhaseTimer()
+        self.collected_metrics = None
         try:
             logger.info('=======================================')
             logger.info('Performing combination: ' + slugify(comb))
 
-            self.clean_k8s_resources(kube_namespace, comb['n_fmke_client_per_dc'])
-            self.deploy_riakkv(kube_namespace, comb)
-            self.deploy_fmke_app(kube_namespace, comb)
-            pop_result = self.deploy_fmke_pop(kube_namespace, comb)
+            topology = self._get_riakkv_topology(comb)
+            if (self.configs['exp_env'].get('reuse_riakkv_cluster', False) and self.deployed_riakkv
+                    and self.deployed_riakkv['topology'] == topology):
+                logger.info('Reusing the RiakKV cluster and the data of the previous combination')
+                riakkv_sites = self.deployed_riakkv['riakkv_sites']
+                pop_result = self.deployed_riakkv['pop_result']
+                self.clean_fmke_resources(kube_namespace, comb['n_fmke_client_per_dc'])
+                self.deploy_fmke_app(kube_namespace, comb)
+            else:
+                self.deployed_riakkv = None
+                use_snapshot = self.configs['exp_env'].get('riakkv_snapshot', False)
+                self.clean_k8s_resources(kube_namespace, comb['n_fmke_client_per_dc'])
+                riakkv_sites = self.deploy_riakkv(kube_namespace, comb)
+                if use_snapshot and topology in self.riakkv_snapshots:
+                    snapshot = self.riakkv_snapshots[topology]
+                    try:
+                        self.restore_riakkv_snapshot(kube_namespace, riakkv_sites, snapshot['snapshot_id'])
+                    except CancelCombException:
+                        # the snapshot is incomplete, the next deployment of this topology is populated again
+                        del self.riakkv_snapshots[topology]
+                        raise
+                    pop_result = snapshot['pop_result']
+                    self.deploy_fmke_app(kube_namespace, comb)
+                else:
+                    self.deploy_fmke_app(kube_namespace, comb)
+                    pop_result = self.deploy_fmke_pop(kube_namespace, comb, riakkv_sites)
+                    if use_snapshot:
+                        snapshot_id = '-'.join(str(each) for each in topology)
+                        if self.take_riakkv_snapshot(kube_namespace, riakkv_sites, snapshot_id):
+                            self.riakkv_snapshots[topology] = {'snapshot_id': snapshot_id,
+                                                               'pop_result': pop_result}
+                self.deployed_riakkv = {'topology': topology,
+                                        'riakkv_sites': riakkv_sites,
+                                        'pop_result': pop_result}
             if comb['n_fmke_client_per_dc'] > 0:
-                self.deploy_fmke_client(kube_namespace, comb)
-                self.save_results(comb, pop_result)
+                load_search = self.configs['exp_env'].get('load_search') or dict()
+                stress_comb = comb
+                if load_search.get('enable', False):
+                    # the confirmation run of the concurrency found by the search, saved as a usual combination
+                    concurrent_clients = self._search_load(kube_namespace, comb, load_search)
+                    stress_comb = dict(comb, concurrent_clients=concurrent_clients) if concurrent_clients else None
+                if stress_comb:
+                    self.deploy_fmke_client(kube_namespace, stress_comb)
+                    if self.result_pipeline:
+                        self._submit_results(comb, stress_comb, pop_result)
+                        handed_off = True
+                    else:
+                        comb_dir = self.save_results(stress_comb, pop_result)
             else:
                 self.save_results_poptime(comb, pop_result)
             comb_ok = True
         except (ExecuteCommandException, CancelCombException) as e:
             comb_ok = False
+            # the state of the RiakKV cluster is unknown, the next combination deploys a new one
+            self.deployed_riakkv = None
         finally:
-            if comb_ok:
+            if not handed_off:
+                try:
+                    self._save_timings(comb, comb_dir, comb_ok)
+                except (IOError, OSError, ValueError) as e:
+                    logger.warning('Cannot save the timings of the combination: %s' % e)
+            if self.collected_metrics:
+                shutil.rmtree(self.collected_metrics, ignore_errors=True)
+                self.collected_metrics = None
+            if handed_off:
+                logger.info('The results of %s are collected in the background' % slugify(comb))
+            elif comb_ok:
                 sweeper.done(comb)
                 logger.info('Finish combination: %s' % slugify(comb))
             else:
@@ -570,8 +1904,69 @@ class FMKe_riakkv_g5k(performing_actions_g5k):
             logger.info('%s combinations remaining\n' % len(sweeper.get_remaining()))
         return sweeper
 
+    def _get_pools(self):
+        # the names of the node pools, none when the node pools mode is disabled
+        node_pools = self.configs['exp_env'].get('node_pools') or dict()
+        if not node_pools.get('enable', False):
+            return list()
+        return ['pool%s' % i for i in range(1, node_pools.get('n_pools', 2) + 1)]
+
+    def _create_pool_engine(self, pool):
+        # An engine that runs its combinations on the nodes of the pool only, with its own copy of the
+        # yaml files and its own RiakKV cluster and snapshots. The sweeper, the results directory and
+        # the result pipeline are shared with the other pools
+        engine = copy.copy(self)
+        engine.pool = pool
+        engine.configs = copy.deepcopy(self.configs)
+        for key in ['riakkv_yaml_path', 'fmke_yaml_path', 'monitoring_yaml_path']:
+            pool_path = '%s_%s' % (self.configs['exp_env'][key], pool)
+            if os.path.exists(pool_path):
+                shutil.rmtree(pool_path)
+            shutil.copytree(self.configs['exp_env'][key], pool_path)
+            engine.configs['exp_env'][key] = pool_path
+        engine.deployed_riakkv = None
+        engine.riakkv_snapshots = dict()
+        engine.timer = PhaseTimer()
+        engine.collected_metrics = None
+        return engine
+
+    def _run_pools(self, kube_master, oar_job_ids, sweeper):
+        # Run one combination on every node pool at the same time, each pool in its own namespace,
+        # until no combination remains or the reservation ends. An unexpected error of a pool is
+        # raised once all the pools are stopped, as it stops the sequential workflow
+        sweeper = LockedSweeper(sweeper)
+        errors = list()
+
+        def run_pool(engine, kube_namespace):
+            try:
+                while not errors and is_job_alive(oar_job_ids):
+                    comb = sweeper.get_next(engine._sort_combs)
+                    if comb is None:
+                        break
+                    engine.run_exp_workflow(kube_namespace=kube_namespace,
+                                            kube_master=kube_master,
+                                            comb=comb,
+                                            sweeper=sweeper)
+                    engine._report_collected_results(sweeper)
+            except Exception as e:
+                logger.error('Node pool %s failed: %s' % (engine.pool, e), exc_info=True)
+                errors.append(e)
+
+        if self.pool_engines is None:
+            self.pool_engines = [self._create_pool_engine(pool) for pool in self._get_pools()]
+        threads = list()
+        for engine in self.pool_engines:
+            thread = Thread(target=run_pool, args=(engine, 'fmke-exp-%s' % engine.pool), name=engine.pool)
+            thread.start()
+            threads.append(thread)
+        for thread in threads:
+            thread.join()
+        self._report_collected_results(sweeper, wait=True)
+        if errors:
+            raise errors[0]
+
     def _set_kube_workers_label(self, kube_workers):
-        configurator = k8s_resources_configurator()
+        configurator = k8s_session
         clusters = dict()
         for host in kube_workers:
             cluster = host.split('-')[0]
@@ -582,12 +1977,17 @@ class FMKe_riakkv_g5k(performing_actions_g5k):
         n_fmke_per_dc = max(self.normalized_parameters['n_fmke_client_per_dc'])
         n_riakkv_per_dc = max(self.normalized_parameters['n_riakkv_per_dc'])
 
+        # in the node pools mode, every pool gets the nodes of the largest topology on each cluster
         for cluster, list_of_hosts in clusters.items():
-            for n, service_name in [(n_riakkv_per_dc, 'riakkv'), (n_fmke_per_dc, 'fmke')]:
-                for host in list_of_hosts[0: n]:
-                    configurator.set_labels_node(nodename=host,
-                                                 labels='service_g5k=%s' % service_name)
-                list_of_hosts = list_of_hosts[n:]
+            for pool in self._get_pools() or [None]:
+                for n, service_name in [(n_riakkv_per_dc, 'riakkv'), (n_fmke_per_dc, 'fmke')]:
+                    for host in list_of_hosts[0: n]:
+                        configurator.set_labels_node(nodename=host,
+                                                     labels='service_g5k=%s' % service_name)
+                        if pool:
+                            configurator.set_labels_node(nodename=host,
+                                                         labels='pool_g5k=%s' % pool)
+                    list_of_hosts = list_of_hosts[n:]
 
     def _setup_g5k_kube_volumes(self, kube_workers, n_pv=3):
         logger.info("Setting volumes on %s kubernetes workers" % len(kube_workers))
@@ -603,16 +2003,19 @@ class FMKe_riakkv_g5k(performing_actions_g5k):
         execute_cmd(cmd, kube_workers)
 
         logger.info("Creating local persistance volumes on Kubernetes cluster")
-        logger.debug("Init configurator: k8s_resources_configurator")
-        configurator = k8s_resources_configurator()
+        configurator = k8s_session
         riakkv_k8s_dir = self.configs['exp_env']['riakkv_yaml_path']
         deploy_files = [os.path.join(riakkv_k8s_dir, 'local_persistentvolume.yaml'),
                         os.path.join(riakkv_k8s_dir, 'storageClass.yaml')]
         configurator.deploy_k8s_resources(files=deploy_files)
 
         logger.info('Waiting for setting local persistance volumes')
-        configurator.wait_k8s_resources(resource='pod',
-                                        label_selectors="app.kubernetes.io/instance=local-volume-provisioner")
+        # the provisioner is a DaemonSet, it runs one pod on each worker
+        provisioners = wait_k8s_ready(resource='pod',
+                                      label_selectors="app.kubernetes.io/instance=local-volume-provisioner",
+                                      n_expected=len(kube_workers))
+        if provisioners is None:
+            raise CancelCombException("Cannot start the local volume provisioner on all the kubernetes workers")
 
     def _get_credential(self, kube_master):
         home = os.path.expanduser('~')
@@ -623,6 +2026,8 @@ class FMKe_riakkv_g5k(performing_actions_g5k):
                     dest_location=kube_dir, action='get')
         kube_config_file = os.path.join(kube_dir, 'config')
         config.load_kube_config(config_file=kube_config_file)
+        # the API connections and the listings of the previous cluster are not valid anymore
+        k8s_session.reset()
         logger.info('Kubernetes config file is stored at: %s' % kube_config_file)
 
     def deploy_k8s(self, kube_master):
@@ -636,7 +2041,7 @@ class FMKe_riakkv_g5k(performing_actions_g5k):
         self._get_credential(kube_master)
 
         logger.info('Create k8s namespace "%s" for this experiment' % kube_namespace)
-        configurator = k8s_resources_configurator()
+        configurator = k8s_session
         configurator.create_namespace(namespace=kube_namespace)
 
         self._setup_g5k_kube_volumes(kube_workers, n_pv=3)
@@ -698,6 +2103,7 @@ class FMKe_riakkv_g5k(performing_actions_g5k):
             kube_master_site = self.configs['exp_env']['clusters'][0]
 
         n_nodes_per_cluster = ( max(self.normalized_parameters['n_fmke_client_per_dc']) + max(self.normalized_parameters['n_riakkv_per_dc']))
+        n_nodes_per_cluster *= max(len(self._get_pools()), 1)
 
         # set dataset and n_fmke_pop_process to default in case not provided
         if 'dataset' not in self.normalized_parameters:
@@ -739,6 +2145,9 @@ class FMKe_riakkv_g5k(performing_actions_g5k):
         self.configs = parse_config_file(self.args.config_file_path)
         # Add the number of Riak KV DC as a parameter
         self.configs['parameters']['n_dc'] = len(self.configs['exp_env']['clusters'])
+        if (self.configs['exp_env'].get('load_search') or dict()).get('enable', False):
+            logger.info('Load search mode: the concurrent_clients parameter is replaced by the searched concurrency')
+            self.configs['parameters'].pop('concurrent_clients', None)
 
         logger.debug('Normalize the parameter space')
         self.normalized_parameters = define_parameters(self.configs['parameters'])
@@ -762,21 +2171,45 @@ class FMKe_riakkv_g5k(performing_actions_g5k):
         sweeper = create_paramsweeper(result_dir=self.configs['exp_env']['results_dir'],
                                       parameters=self.normalized_parameters)
 
+        pipeline = self.configs['exp_env'].get('pipeline') or dict()
+        if pipeline.get('enable', False):
+            logger.info('Pipelined mode: the results are downloaded and processed in the background')
+            # the job is run by the engine (of the node pool) of its combination
+            self.result_pipeline = ResultPipeline(lambda job: job['engine']._collect_results(job),
+                                                  pipeline.get('max_pending', 1))
+
         kube_namespace = 'fmke-exp'
         oar_job_ids = None
         while len(sweeper.get_remaining()) > 0:
             if oar_job_ids is None:
                 kube_master, oar_job_ids = self.setup_env(kube_master_site, kube_namespace)
 
-            comb = sweeper.get_next()
+            if self._get_pools():
+                self._run_pools(kube_master, oar_job_ids, sweeper)
+                if not is_job_alive(oar_job_ids):
+                    oardel(oar_job_ids)
+                    oar_job_ids = None
+                    self.pool_engines = None
+                continue
+
+            comb = sweeper.get_next(self._sort_combs)
+            if comb is None and self.result_pipeline:
+                # the last combinations wait for their results in the result pipeline
+                self._report_collected_results(sweeper, wait=True)
+                continue
             sweeper = self.run_exp_workflow(kube_namespace=kube_namespace,
                                             kube_master=kube_master,
                                             comb=comb,
                                             sweeper=sweeper)
+            # wait for the results of the last combinations, the canceled ones are run again
+            self._report_collected_results(sweeper, wait=len(sweeper.get_remaining()) == 0)
 
             if not is_job_alive(oar_job_ids):
+                self._report_collected_results(sweeper, wait=True)
                 oardel(oar_job_ids)
                 oar_job_ids = None
+                self.deployed_riakkv = None
+                self.riakkv_snapshots = dict()
         logger.info('Finish the experiment!!!')
 
 